@@ -0,0 +1,77 @@
+"""
+Serviciul HTTP de transcriere (endpoint-ul /upload-audio/ din main.ipynb)
+Aplicatia FastAPI primeste functia de transcriere, astfel incat poate fi pornita cu modelul
+real, cu un model stub (teste de incarcare fara descarcari) sau direct din notebook.
+"""
+
+import os
+import threading
+import time
+import uuid
+from typing import Callable
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from core.audio_stream import TARGET_SAMPLE_RATE, stream_audio
+
+
+class StubTranscriber:
+    """
+    Inlocuitor pentru Whisper: decodeaza si resampleaza audio-ul ca pipeline-ul real,
+    apoi "transcrie" in `rtf` secunde per secunda de audio
+    """
+
+    def __init__(self, rtf: float = 0.05):
+        self.rtf = rtf
+
+    def transcribe(self, audio_path: str, verbose: bool = False) -> str:
+        samples = sum(len(block) for block in stream_audio(audio_path))
+        durata = samples / TARGET_SAMPLE_RATE
+        time.sleep(durata * self.rtf)
+        return f"[stub] {durata:.1f}s audio"
+
+
+def create_app(transcribe: Callable[[str], str], upload_folder: str = "uploads",
+               keep_uploads: bool = True, max_concurrency: int = 1) -> FastAPI:
+    """
+    Args:
+        transcribe: Functia audio_path -> text (ex: transcribe din notebook)
+        upload_folder: Directorul in care se salveaza fisierele primite
+        keep_uploads: Pastreaza fisierele dupa transcriere (altfel sunt sterse)
+        max_concurrency: Transcrieri simultane (un model in memorie = 1)
+    """
+    app = FastAPI()
+    os.makedirs(upload_folder, exist_ok=True)
+    # Transcrierea ruleaza in thread pool (event loop-ul ramane liber), limitata de semafor
+    limita = threading.BoundedSemaphore(max_concurrency)
+
+    def transcrie(file_path: str) -> str:
+        with limita:
+            return transcribe(file_path)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.post("/upload-audio/")
+    async def upload_audio(file: UploadFile = File(...)):
+        # Nume unic: cereri simultane cu acelasi nume de fisier nu se suprascriu
+        file_path = os.path.join(upload_folder, f"{uuid.uuid4().hex[:8]}_{os.path.basename(file.filename)}")
+        content = await file.read()
+        with open(file_path, "wb") as buffer:
+            buffer.write(content)
+        file_size = len(content)
+        try:
+            transcription = await run_in_threadpool(transcrie, file_path)
+        finally:
+            if not keep_uploads:
+                os.remove(file_path)
+        return JSONResponse({
+            "filename": file.filename,
+            "size_bytes": file_size,
+            "transcription": transcription
+        })
+
+    return app
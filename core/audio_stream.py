@@ -0,0 +1,204 @@
+"""
+Citire audio in flux (streaming) pentru inregistrari lungi
+Decodeaza fisierul in blocuri de dimensiune fixa (soundfile.blocks), face downmix la mono
+si resampleaza incremental la 16 kHz cu un filtru polifazic cu stare, astfel incat
+memoria folosita ramane constanta indiferent de durata inregistrarii.
+"""
+
+from math import gcd
+from typing import Iterator
+
+import numpy as np
+import soundfile as sf
+
+TARGET_SAMPLE_RATE = 16000
+BLOCK_SIZE = 65536
+# Numarul maxim de esantioane de iesire calculate intr-un singur pas vectorizat
+OUTPUT_BATCH = 4096
+
+
+class StreamingResampler:
+    """
+    Resampler rational L/M (polifazic, FIR windowed-sinc cu fereastra Kaiser) cu stare
+
+    Blocurile consecutive produc aceeasi iesire ca procesarea semnalului intreg;
+    la final se apeleaza flush() pentru ultimele esantioane.
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int = TARGET_SAMPLE_RATE,
+                 zero_crossings: int = 16, rolloff: float = 0.945, beta: float = 8.6):
+        """
+        Args:
+            orig_sr: Frecventa de esantionare a intrarii
+            target_sr: Frecventa de esantionare dorita
+            zero_crossings: Semi-latimea filtrului (in treceri prin zero ale sinc-ului)
+            rolloff: Frecventa de taiere relativa la Nyquist-ul cel mai mic
+            beta: Parametrul ferestrei Kaiser
+        """
+        g = gcd(int(orig_sr), int(target_sr))
+        self.up = int(target_sr) // g
+        self.down = int(orig_sr) // g
+        self.passthrough = self.up == self.down
+
+        if not self.passthrough:
+            # Filtrul este proiectat la frecventa semnalului supraesantionat (orig_sr * up)
+            factor = max(self.up, self.down)
+            num_taps = 2 * zero_crossings * factor + 1
+            cutoff = rolloff * 0.5 / factor
+            n = np.arange(num_taps) - (num_taps - 1) / 2
+            h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(num_taps, beta) * self.up
+
+            # Matricea polifazica: randul p contine coeficientii h[p + k*up], in ordine inversa
+            # pentru a putea fi inmultit direct cu ferestre glisante x[i0-K+1 .. i0]
+            self.taps = -(-num_taps // self.up)
+            padded = np.zeros(self.taps * self.up)
+            padded[:num_taps] = h
+            self.phases = padded.reshape(self.taps, self.up).T[:, ::-1].astype(np.float32)
+            self.delay = (num_taps - 1) // 2
+
+            # Istoric: ultimele K-1 esantioane (zerouri la inceput)
+            self._buf = np.zeros(self.taps - 1, dtype=np.float32)
+            self._buf_start = -(self.taps - 1)
+
+        self._consumed = 0
+        self._produced = 0
+
+    def _output_range(self, last_input: int) -> int:
+        """Primul index de iesire care NU poate fi calculat avand intrari pana la `last_input`"""
+        limit = last_input * self.up + self.up - 1 - self.delay
+        return max(self._produced, limit // self.down + 1) if limit >= 0 else self._produced
+
+    def _compute(self, n_end: int) -> np.ndarray:
+        # Blocurile scurte pot sa nu produca nicio iesire; dupa _trim() istoricul poate fi
+        # atunci mai scurt decat filtrul, deci ferestrele se construiesc doar cand sunt necesare
+        if n_end <= self._produced or len(self._buf) < self.taps:
+            return np.zeros(0, dtype=np.float32)
+        out = np.empty(n_end - self._produced, dtype=np.float32)
+        windows = np.lib.stride_tricks.sliding_window_view(self._buf, self.taps)
+
+        for start in range(self._produced, n_end, OUTPUT_BATCH):
+            n = np.arange(start, min(start + OUTPUT_BATCH, n_end), dtype=np.int64)
+            t = n * self.down + self.delay
+            i0 = t // self.up
+            rows = windows[i0 - self.taps + 1 - self._buf_start]
+            out[start - self._produced:start - self._produced + len(n)] = np.einsum(
+                'nk,nk->n', rows, self.phases[t % self.up])
+
+        self._produced = n_end
+        return out
+
+    def _trim(self):
+        """Pastreaza doar istoricul necesar pentru urmatoarea iesire"""
+        next_i0 = (self._produced * self.down + self.delay) // self.up
+        keep_from = next_i0 - self.taps + 1
+        if keep_from > self._buf_start:
+            self._buf = self._buf[keep_from - self._buf_start:].copy()
+            self._buf_start = keep_from
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Resampleaza un bloc mono; intoarce esantioanele de iesire disponibile"""
+        block = np.asarray(block, dtype=np.float32)
+        self._consumed += len(block)
+        if self.passthrough:
+            return block
+
+        self._buf = np.concatenate([self._buf, block])
+        out = self._compute(self._output_range(self._consumed - 1))
+        self._trim()
+        return out
+
+    def flush(self) -> np.ndarray:
+        """Completeaza cu zerouri si intoarce coada semnalului resamplat"""
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+
+        expected = -(-self._consumed * self.up // self.down)
+        if expected <= self._produced:
+            return np.zeros(0, dtype=np.float32)
+
+        last_i0 = ((expected - 1) * self.down + self.delay) // self.up
+        pad = last_i0 - (self._buf_start + len(self._buf)) + 1
+        if pad > 0:
+            self._buf = np.concatenate([self._buf, np.zeros(pad, dtype=np.float32)])
+        return self._compute(expected)
+
+
+def stream_audio(audio_path: str, target_sr: int = TARGET_SAMPLE_RATE,
+                 block_size: int = BLOCK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Citeste fisierul audio in blocuri si intoarce bucati mono la `target_sr`
+
+    Args:
+        audio_path: Calea catre fisierul audio (orice format suportat de libsndfile)
+        target_sr: Frecventa de esantionare a iesirii
+        block_size: Numarul de cadre citite per bloc
+    """
+    orig_sr = sf.info(audio_path).samplerate
+    resampler = StreamingResampler(orig_sr, target_sr)
+
+    for block in sf.blocks(audio_path, blocksize=block_size, dtype='float32', always_2d=True):
+        # stereo -> mono
+        mono = block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)
+        out = resampler.process(mono)
+        if len(out):
+            yield out
+
+    tail = resampler.flush()
+    if len(tail):
+        yield tail
+
+
+def stream_chunks(audio_path: str, chunk_sec: float = 30, target_sr: int = TARGET_SAMPLE_RATE,
+                  block_size: int = BLOCK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Grupeaza fluxul audio in segmente de `chunk_sec` secunde (ultimul poate fi mai scurt)
+
+    Fiecare segment este un array nou; memoria ramane limitata la un segment + un bloc.
+    """
+    chunk_samples = int(chunk_sec * target_sr)
+    chunk = np.empty(chunk_samples, dtype=np.float32)
+    filled = 0
+
+    for piece in stream_audio(audio_path, target_sr, block_size):
+        pos = 0
+        while pos < len(piece):
+            take = min(chunk_samples - filled, len(piece) - pos)
+            chunk[filled:filled + take] = piece[pos:pos + take]
+            filled += take
+            pos += take
+            if filled == chunk_samples:
+                yield chunk.copy()
+                filled = 0
+
+    if filled:
+        yield chunk[:filled].copy()
+
+
+if __name__ == "__main__":
+    # Verificare: procesarea in blocuri (inclusiv blocuri foarte scurte si lungimi chiar dupa
+    # marginea unui bloc) produce aceeasi iesire ca semnalul intreg
+    import os
+    import tempfile
+
+    def resample(x, sr, block_size):
+        resampler = StreamingResampler(sr)
+        out = [resampler.process(x[i:i + block_size]) for i in range(0, len(x), block_size)]
+        return np.concatenate(out + [resampler.flush()])
+
+    rng = np.random.default_rng(0)
+    for sr in (8000, 11025, 22050, 44100, 48000):
+        for lungime in (5, BLOCK_SIZE + 1, BLOCK_SIZE + 2):
+            x = rng.standard_normal(lungime).astype(np.float32)
+            referinta = resample(x, sr, lungime)
+            for block_size in (1, 7, BLOCK_SIZE):
+                y = resample(x, sr, block_size)
+                assert len(y) == len(referinta) and np.allclose(y, referinta, atol=1e-5), (sr, lungime, block_size)
+
+    with tempfile.TemporaryDirectory() as director:
+        path = os.path.join(director, "test.wav")
+        x = rng.standard_normal(BLOCK_SIZE + 1).astype(np.float32) * 0.1
+        sf.write(path, x, 48000)
+        y = np.concatenate(list(stream_chunks(path)))
+        assert np.allclose(y, resample(sf.read(path, dtype='float32')[0], 48000, BLOCK_SIZE + 1), atol=1e-5)
+
+    print("✓ Resampling in flux identic cu procesarea semnalului intreg")
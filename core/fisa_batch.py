@@ -0,0 +1,401 @@
+"""
+Reprezentare columnara pentru loturi mari de FisaPacient (analize pe cohorte)
+Fiecare tip de entitate este un tabel de coloane NumPy: indexul fisei, coduri de categorie
+(sirurile sunt internate intr-un singur vocabular) si, pentru masuratori, valorile float64.
+Lotul se salveaza in .npz necomprimat si se poate incarca prin memory mapping.
+"""
+
+import json
+import struct
+import zipfile
+from dataclasses import is_dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from core.medical_entity_extractor import MasuratoareEcografica, Medicament
+from core.results_store import PATTERN_FISE, este_fisa_pacient
+
+# Campurile cu pozitii in FisaPacient.pozitii; bitul i din `fise__pozitii` marcheaza prezenta campului i
+CAMPURI_POZITII = ('masuratori_ecografice', 'simptome', 'diagnostice', 'medicamente')
+# Bit suplimentar: dictionarul fisei nu avea cheia 'pozitii' (JSON-uri scrise inainte de pozitii)
+FARA_POZITII = 1 << len(CAMPURI_POZITII)
+
+# Tabel -> coloanele de coduri (None: lista simpla de siruri, coloana `cod`), in ordinea din FisaPacient
+TABELE = {
+    'masuratori_ecografice': ('structura_anatomica', 'unitate_masura', 'tip_masurare'),
+    'simptome': None,
+    'diagnostice': None,
+    'medicamente': ('nume', 'dozaj', 'frecventa'),
+    'observatii': None,
+}
+
+
+def _campuri(fisa: Any) -> Dict[str, Any]:
+    """Accepta FisaPacient sau dictionarul echivalent (din JSON / cache)"""
+    if is_dataclass(fisa):
+        return {camp: getattr(fisa, camp) for camp in (*TABELE, 'pozitii')}
+    return fisa
+
+
+def _mmap_npz(path: str) -> Dict[str, np.ndarray]:
+    """
+    Deschide un .npz necomprimat cu memory mapping
+
+    np.load ignora mmap_mode pentru arhive .npz; aici se gaseste offset-ul fiecarui
+    fisier .npy din arhiva si se mapeaza direct datele.
+    """
+    arrays = {}
+    with open(path, 'rb') as f, zipfile.ZipFile(f) as zf:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: memory mapping necesita o arhiva necomprimata (np.savez)")
+            # Header-ul local: 30 de octeti fixi + numele fisierului + campul extra
+            f.seek(info.header_offset)
+            header = f.read(30)
+            lungime_nume, lungime_extra = struct.unpack('<HH', header[26:30])
+            f.seek(info.header_offset + 30 + lungime_nume + lungime_extra)
+
+            versiune = np.lib.format.read_magic(f)
+            if versiune == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+
+            nume = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if int(np.prod(shape)) == 0:
+                arrays[nume] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[nume] = np.memmap(path, dtype=dtype, mode='r', shape=shape,
+                                         order='F' if fortran else 'C', offset=f.tell())
+    return arrays
+
+
+class FisaBatch:
+    """
+    Lot columnar de fise (FisaPacient sau dictionarele lor)
+
+    Coloanele se numesc `<tabel>__<coloana>`: `fisa` (indexul fisei), coduri int32 in
+    `categorii`, `valoare_numerica` (float64, doar masuratori), `start`/`end` (pozitii, -1 daca lipsesc).
+    """
+
+    def __init__(self, n_fise: int, categorii: Sequence[str], coloane: Dict[str, np.ndarray]):
+        self.n_fise = n_fise
+        self.categorii = list(categorii)
+        self.coloane = coloane
+        self._coduri = None
+        self._limite = {}
+
+    def __len__(self) -> int:
+        return self.n_fise
+
+    def __getitem__(self, nume: str) -> np.ndarray:
+        return self.coloane[nume]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(coloana.nbytes for coloana in self.coloane.values())
+
+    # ---------- conversie ----------
+
+    @classmethod
+    def from_fise(cls, fise: Iterable[Any]) -> "FisaBatch":
+        """Construieste lotul dintr-un iterabil de FisaPacient / dictionare"""
+        vocabular: Dict[str, int] = {}
+
+        def cod(s: str) -> int:
+            c = vocabular.get(s)
+            if c is None:
+                c = vocabular[s] = len(vocabular)
+            return c
+
+        randuri = {tabel: {'fisa': [], 'start': [], 'end': []} for tabel in TABELE}
+        for tabel, coloane_text in TABELE.items():
+            for coloana in (coloane_text or ('cod',)):
+                randuri[tabel][coloana] = []
+        randuri['masuratori_ecografice']['valoare_numerica'] = []
+        masti_pozitii = []
+
+        n_fise = 0
+        for i, fisa in enumerate(fise):
+            n_fise += 1
+            date = _campuri(fisa)
+            pozitii = date.get('pozitii') or {}
+            necunoscute = set(pozitii) - set(CAMPURI_POZITII)
+            if necunoscute:
+                raise ValueError(f"Fisa {i}: pozitii pentru campuri necunoscute {sorted(necunoscute)}")
+            masca = 0 if 'pozitii' in date else FARA_POZITII
+
+            for tabel, coloane_text in TABELE.items():
+                entitati = date.get(tabel, [])
+                r = randuri[tabel]
+                spans = pozitii.get(tabel) if tabel in CAMPURI_POZITII else None
+                if spans is not None:
+                    if len(spans) != len(entitati):
+                        raise ValueError(f"Fisa {i}: pozitii[{tabel!r}] nu este aliniat cu entitatile")
+                    masca |= 1 << CAMPURI_POZITII.index(tabel)
+                else:
+                    spans = [(-1, -1)] * len(entitati)
+
+                for entitate, (start, end) in zip(entitati, spans):
+                    r['fisa'].append(i)
+                    r['start'].append(start)
+                    r['end'].append(end)
+                    if coloane_text is None:
+                        r['cod'].append(cod(entitate))
+                    else:
+                        for coloana in coloane_text:
+                            r[coloana].append(cod(entitate[coloana]))
+                        if tabel == 'masuratori_ecografice':
+                            r['valoare_numerica'].append(entitate['valoare_numerica'])
+            masti_pozitii.append(masca)
+
+        coloane = {'fise__pozitii': np.array(masti_pozitii, dtype=np.uint8)}
+        for tabel, r in randuri.items():
+            for coloana, valori in r.items():
+                if coloana == 'valoare_numerica':
+                    dtype = np.float64
+                elif coloana in ('start', 'end'):
+                    dtype = np.int64
+                else:
+                    dtype = np.int32
+                coloane[f"{tabel}__{coloana}"] = np.array(valori, dtype=dtype)
+
+        return cls(n_fise, list(vocabular), coloane)
+
+    @classmethod
+    def from_json_dir(cls, directory: str = "data", pattern: str = PATTERN_FISE) -> "FisaBatch":
+        """Incarca fisele JSON salvate de pipeline (campurile derivate, ex. FHIR, sunt ignorate)"""
+        def citeste():
+            for path in sorted(Path(directory).glob(pattern)):
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if este_fisa_pacient(data):
+                    yield data
+        return cls.from_fise(citeste())
+
+    def _limite_tabel(self, tabel: str) -> np.ndarray:
+        """Randurile fisei i din tabel sunt [limite[i], limite[i + 1])"""
+        if tabel not in self._limite:
+            self._limite[tabel] = np.searchsorted(self.coloane[f"{tabel}__fisa"], np.arange(self.n_fise + 1))
+        return self._limite[tabel]
+
+    def to_fise(self) -> List[Dict[str, Any]]:
+        """Dictionarele fiselor, identice cu asdict(FisaPacient) / JSON-ul de intrare"""
+        text = self.categorii
+        fise = [{tabel: [] for tabel in TABELE} for _ in range(self.n_fise)]
+        pozitii = [{} for _ in range(self.n_fise)]
+        masti = self.coloane['fise__pozitii'].tolist()
+
+        for tabel, coloane_text in TABELE.items():
+            col = lambda nume: self.coloane[f"{tabel}__{nume}"].tolist()
+            limite = self._limite_tabel(tabel).tolist()
+            starts, ends = col('start'), col('end')
+
+            if coloane_text is None:
+                entitati = [text[c] for c in col('cod')]
+            elif tabel == 'masuratori_ecografice':
+                entitati = [
+                    MasuratoareEcografica(text[s], v, text[u], text[t]).to_dict()
+                    for s, v, u, t in zip(col('structura_anatomica'), col('valoare_numerica'),
+                                          col('unitate_masura'), col('tip_masurare'))
+                ]
+            else:
+                entitati = [
+                    Medicament(text[n], text[d], text[f]).to_dict()
+                    for n, d, f in zip(col('nume'), col('dozaj'), col('frecventa'))
+                ]
+
+            bit = 1 << CAMPURI_POZITII.index(tabel) if tabel in CAMPURI_POZITII else 0
+            for i in range(self.n_fise):
+                a, b = limite[i], limite[i + 1]
+                fise[i][tabel] = entitati[a:b]
+                if masti[i] & bit:
+                    pozitii[i][tabel] = [[starts[j], ends[j]] for j in range(a, b)]
+
+        for fisa, p, masca in zip(fise, pozitii, masti):
+            if not masca & FARA_POZITII:
+                fisa['pozitii'] = {camp: p[camp] for camp in CAMPURI_POZITII if camp in p}
+        return fise
+
+    def masuratori(self, i: int) -> List[MasuratoareEcografica]:
+        """Masuratorile fisei i ca obiecte compacte (__slots__)"""
+        limite = self._limite_tabel('masuratori_ecografice')
+        rand = slice(limite[i], limite[i + 1])
+        col = lambda nume: self.coloane[f"masuratori_ecografice__{nume}"][rand].tolist()
+        return [MasuratoareEcografica(self.categorii[s], v, self.categorii[u], self.categorii[t])
+                for s, v, u, t in zip(col('structura_anatomica'), col('valoare_numerica'),
+                                      col('unitate_masura'), col('tip_masurare'))]
+
+    def medicamente(self, i: int) -> List[Medicament]:
+        limite = self._limite_tabel('medicamente')
+        rand = slice(limite[i], limite[i + 1])
+        col = lambda nume: self.coloane[f"medicamente__{nume}"][rand].tolist()
+        return [Medicament(self.categorii[n], self.categorii[d], self.categorii[f])
+                for n, d, f in zip(col('nume'), col('dozaj'), col('frecventa'))]
+
+    # ---------- filtre ----------
+
+    def coduri(self, valoare: str, normalizare=None) -> np.ndarray:
+        """Codurile categoriilor egale cu `valoare` (optional dupa o functie de normalizare)"""
+        if normalizare is None:
+            if self._coduri is None:
+                self._coduri = {s: c for c, s in enumerate(self.categorii)}
+            c = self._coduri.get(valoare)
+            return np.array([] if c is None else [c], dtype=np.int32)
+        tinta = normalizare(valoare)
+        return np.array([c for c, s in enumerate(self.categorii) if normalizare(s) == tinta], dtype=np.int32)
+
+    def masca_masuratori(self, structura: str = None, min_valoare: float = None,
+                         max_valoare: float = None, unitate: str = None, peste: float = None,
+                         sub: float = None) -> np.ndarray:
+        """
+        Masca booleana peste randurile de masuratori
+
+        Ca ResultsStore.query_masuratori: min_valoare / max_valoare inclusive, peste / sub stricte.
+        """
+        tabel = 'masuratori_ecografice'
+        masca = np.ones(len(self.coloane[f"{tabel}__fisa"]), dtype=bool)
+        if structura is not None:
+            coduri = self.coduri(structura, lambda s: s.lower().strip())
+            masca &= np.isin(self.coloane[f"{tabel}__structura_anatomica"], coduri)
+        if min_valoare is not None:
+            masca &= self.coloane[f"{tabel}__valoare_numerica"] >= min_valoare
+        if max_valoare is not None:
+            masca &= self.coloane[f"{tabel}__valoare_numerica"] <= max_valoare
+        if peste is not None:
+            masca &= self.coloane[f"{tabel}__valoare_numerica"] > peste
+        if sub is not None:
+            masca &= self.coloane[f"{tabel}__valoare_numerica"] < sub
+        if unitate is not None:
+            masca &= np.isin(self.coloane[f"{tabel}__unitate_masura"], self.coduri(unitate))
+        return masca
+
+    def masca_entitati(self, tabel: str, valoare: str) -> np.ndarray:
+        """Masca peste randurile unui tabel de siruri (simptome, diagnostice, observatii) sau medicamente"""
+        coloana = 'nume' if tabel == 'medicamente' else 'cod'
+        return np.isin(self.coloane[f"{tabel}__{coloana}"], self.coduri(valoare, lambda s: s.casefold()))
+
+    def fise_cu(self, tabel: str, masca: np.ndarray) -> np.ndarray:
+        """Indicii (sortati, unici) fiselor care au cel putin un rand selectat de masca"""
+        return np.unique(self.coloane[f"{tabel}__fisa"][masca])
+
+    def subset(self, indici: Sequence[int]) -> "FisaBatch":
+        """Lot nou doar cu fisele date (vocabularul este partajat)"""
+        indici = np.unique(np.asarray(indici, dtype=np.int64))
+        coloane = {'fise__pozitii': np.asarray(self.coloane['fise__pozitii'])[indici]}
+        for tabel in TABELE:
+            fisa = self.coloane[f"{tabel}__fisa"]
+            pastreaza = np.isin(fisa, indici)
+            for nume, coloana in self.coloane.items():
+                if nume.startswith(f"{tabel}__"):
+                    coloane[nume] = np.asarray(coloana)[pastreaza]
+            coloane[f"{tabel}__fisa"] = np.searchsorted(indici, fisa[pastreaza]).astype(np.int32)
+        return FisaBatch(len(indici), self.categorii, coloane)
+
+    # ---------- statistici ----------
+
+    def _grupuri(self, masca: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Grupeaza masuratorile pe (structura, unitate): (chei unice [G, 2], grup per rand, valori, randuri)"""
+        tabel = 'masuratori_ecografice'
+        randuri = np.arange(len(self.coloane[f"{tabel}__fisa"]))
+        if masca is not None:
+            randuri = randuri[masca]
+        if len(randuri) == 0:
+            gol = np.zeros(0, dtype=np.int64)
+            return np.zeros((0, 2), dtype=np.int32), gol, np.zeros(0), gol
+        # Cheie int64 unica per pereche (mult mai rapid decat np.unique pe randuri)
+        n = len(self.categorii)
+        cheie = (self.coloane[f"{tabel}__structura_anatomica"][randuri].astype(np.int64) * n
+                 + self.coloane[f"{tabel}__unitate_masura"][randuri])
+        chei, grup = np.unique(cheie, return_inverse=True)
+        chei = np.stack([chei // n, chei % n], axis=1)
+        return chei, grup.reshape(-1), np.asarray(self.coloane[f"{tabel}__valoare_numerica"])[randuri], randuri
+
+    @staticmethod
+    def _percentile_grupuri(grup: np.ndarray, valori: np.ndarray, n_grupuri: int,
+                            percentile: Sequence[float]) -> np.ndarray:
+        """Percentilele fiecarui grup [G, P], cu interpolare liniara (ca np.percentile)"""
+        ordine = np.lexsort((valori, grup))
+        sortate = valori[ordine]
+        numar = np.bincount(grup, minlength=n_grupuri)
+        inceput = np.concatenate([[0], np.cumsum(numar)[:-1]])
+
+        q = np.asarray(percentile, dtype=np.float64) / 100.0
+        pozitie = inceput[:, None] + q[None, :] * (numar[:, None] - 1)
+        jos = np.floor(pozitie).astype(np.int64)
+        sus = np.minimum(jos + 1, (inceput + numar - 1)[:, None])
+        fractie = pozitie - jos
+        return sortate[jos] * (1 - fractie) + sortate[sus] * fractie
+
+    def statistici_masuratori(self, percentile: Sequence[float] = (5, 25, 50, 75, 95),
+                              masca: np.ndarray = None) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Numar, medie, deviatie standard, minim, maxim si percentile pe (structura, unitate)"""
+        chei, grup, valori, _ = self._grupuri(masca)
+        if len(chei) == 0:
+            return {}
+
+        n_grupuri = len(chei)
+        numar = np.bincount(grup, minlength=n_grupuri)
+        medie = np.bincount(grup, weights=valori, minlength=n_grupuri) / numar
+        varianta = np.bincount(grup, weights=(valori - medie[grup]) ** 2, minlength=n_grupuri) / numar
+        # Minimul si maximul sunt percentilele 0 si 100
+        perc = self._percentile_grupuri(grup, valori, n_grupuri, (0, 100, *percentile))
+        minim, maxim, perc = perc[:, 0], perc[:, 1], perc[:, 2:]
+
+        rezultat = {}
+        for g, (structura, unitate) in enumerate(chei.tolist()):
+            stat = {'numar': int(numar[g]), 'medie': float(medie[g]), 'std': float(np.sqrt(varianta[g])),
+                    'minim': float(minim[g]), 'maxim': float(maxim[g])}
+            for p, valoare in zip(percentile, perc[g].tolist()):
+                stat[f"p{p:g}"] = valoare
+            rezultat[(self.categorii[structura], self.categorii[unitate])] = stat
+        return rezultat
+
+    def outlieri_masuratori(self, k: float = 1.5, min_numar: int = 5) -> np.ndarray:
+        """
+        Masca masuratorilor atipice pentru structura lor (regula Tukey: in afara [Q1 - k*IQR, Q3 + k*IQR])
+
+        Grupurile cu mai putin de `min_numar` valori nu sunt marcate.
+        """
+        masca = np.zeros(len(self.coloane['masuratori_ecografice__fisa']), dtype=bool)
+        chei, grup, valori, randuri = self._grupuri()
+        if len(chei) == 0:
+            return masca
+
+        q1, q3 = self._percentile_grupuri(grup, valori, len(chei), (25, 75)).T
+        iqr = q3 - q1
+        suficiente = np.bincount(grup, minlength=len(chei)) >= min_numar
+        atipic = (valori < q1[grup] - k * iqr[grup]) | (valori > q3[grup] + k * iqr[grup])
+        masca[randuri] = atipic & suficiente[grup]
+        return masca
+
+    # ---------- persistenta ----------
+
+    def save(self, path: str):
+        """Salveaza lotul ca .npz necomprimat (necesar pentru memory mapping la incarcare)"""
+        codat = [s.encode('utf-8') for s in self.categorii]
+        offset = np.zeros(len(codat) + 1, dtype=np.int64)
+        offset[1:] = np.cumsum([len(b) for b in codat])
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Cu un obiect fisier, np.savez nu adauga ".npz": load(path) gaseste exact aceeasi cale
+        with open(path, 'wb') as f:
+            np.savez(f, n_fise=np.array(self.n_fise, dtype=np.int64),
+                     categorii_date=np.frombuffer(b''.join(codat), dtype=np.uint8),
+                     categorii_offset=offset, **{nume: np.asarray(c) for nume, c in self.coloane.items()})
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "FisaBatch":
+        """Incarca un lot salvat cu save(); cu mmap=True coloanele raman pe disc (np.memmap)"""
+        if mmap:
+            arrays = _mmap_npz(path)
+        else:
+            with np.load(path) as npz:
+                arrays = {nume: npz[nume] for nume in npz.files}
+
+        date = bytes(arrays.pop('categorii_date'))
+        offset = arrays.pop('categorii_offset').tolist()
+        categorii = [date[a:b].decode('utf-8') for a, b in zip(offset, offset[1:])]
+        n_fise = int(arrays.pop('n_fise'))
+        return cls(n_fise, categorii, arrays)
@@ -0,0 +1,279 @@
+"""
+Extractor hibrid de entitati medicale: reguli + model BERT fine-tuned
+Masuratorile si numeralele raman extrase prin pattern matching (MedicalEntityExtractor),
+iar simptomele, diagnosticele si medicamentele sunt completate de modelul de token
+classification rulat pe loturi de propozitii, cu rezultatele memorate per propozitie.
+"""
+
+import re
+import string
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+from core.medical_entity_extractor import EXTRACTOR_VERSION, REEXTRACT_MARGIN, FisaPacient, MedicalEntityExtractor
+
+CALEA_MODEL_NER = "alexvladu1/bert-romanian-medical-issue"
+# Versiunea post-procesarii entitatilor modelului (se adauga la EXTRACTOR_VERSION in cheia cache-ului)
+HYBRID_VERSION = "2"
+
+# Eticheta modelului (fara prefix B-/I-) -> campul din FisaPacient; potrivire dupa subsir
+ETICHETE_IMPLICITE = {
+    'SIMPTOM': 'simptome',
+    'SYMPTOM': 'simptome',
+    'DIAGNOSTIC': 'diagnostice',
+    'BOALA': 'diagnostice',
+    'DISEASE': 'diagnostice',
+    'AFECTIUNE': 'diagnostice',
+    'MEDICAMENT': 'medicamente',
+    'DRUG': 'medicamente',
+    'MEDICATIE': 'medicamente',
+}
+
+# Sfarsit de propozitie: .!? urmat de spatiu/final (nu "1.5") sau linie noua
+SFARSIT_PROPOZITIE = re.compile(r'[.!?]+(?=\s|$)|\n+')
+# Eliminate de la capetele entitatilor modelului (inclusiv punctul de la sfarsitul propozitiei),
+# pentru ca valoarea si pozitia ei sa nu includa punctuatia
+CAPETE_ENTITATE = string.whitespace + ',;:.!?'
+# Caracterele de dupa un medicament in care se cauta dozajul (ex: "  75 mg")
+DOZAJ_CONTEXT = 64
+
+
+def split_sentences(text: str, max_chars: int = 400) -> List[Tuple[int, int]]:
+    """
+    Imparte textul in propozitii si intoarce pozitiile (start, end)
+
+    Propozitiile mai lungi de `max_chars` (transcrieri ASR fara punct) sunt taiate
+    la ultima virgula, pentru a nu depasi lungimea maxima a modelului.
+    """
+    spans = []
+    start = 0
+    for match in SFARSIT_PROPOZITIE.finditer(text):
+        spans.append((start, match.end()))
+        start = match.end()
+    spans.append((start, len(text)))
+
+    rezultat = []
+    for start, end in spans:
+        while end - start > max_chars:
+            taietura = text.rfind(',', start, start + max_chars)
+            taietura = taietura + 1 if taietura > start else start + max_chars
+            rezultat.append((start, taietura))
+            start = taietura
+        rezultat.append((start, end))
+
+    # Elimina spatiile de la capete si bucatile goale
+    curate = []
+    for start, end in rezultat:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            curate.append((start, end))
+    return curate
+
+
+class HybridExtractor(MedicalEntityExtractor):
+    """Reguli pentru masuratori + BERT (pe loturi, optional int8) pentru restul entitatilor"""
+
+    def __init__(self, model_name: str = CALEA_MODEL_NER, model=None, tokenizer=None,
+                 quantize: bool = False, batch_size: int = 16, cache_size: int = 4096,
+                 min_score: float = 0.5, max_length: int = 256, label_map: Dict[str, str] = None,
+                 device=None):
+        """
+        Args:
+            model_name: Modelul de token classification de pe HuggingFace
+            model, tokenizer: Instante deja create (ex: un BERT mic, aleator, pentru teste offline);
+                              daca lipsesc se incarca din `model_name`
+            quantize: Cuantizare dinamica int8 a straturilor Linear (doar CPU)
+            batch_size: Numarul de propozitii per inferenta
+            cache_size: Numarul maxim de propozitii memorate (LRU)
+            min_score: Scorul minim pentru a pastra o entitate
+            max_length: Lungimea maxima in tokeni a unei propozitii
+            label_map: Eticheta -> camp FisaPacient (implicit ETICHETE_IMPLICITE)
+            device: Dispozitivul de inferenta (implicit CPU)
+        """
+        super().__init__()
+
+        if tokenizer is None:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if model is None:
+            from transformers import AutoModelForTokenClassification
+            model = AutoModelForTokenClassification.from_pretrained(model_name)
+
+        self.device = torch.device(device) if device is not None else torch.device("cpu")
+        model.eval()
+        if quantize:
+            # Cuantizarea dinamica este suportata doar pe CPU
+            self.device = torch.device("cpu")
+            model = torch.quantization.quantize_dynamic(model.to("cpu"), {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model.to(self.device)
+        self.tokenizer = tokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.min_score = min_score
+        self.max_length = max_length
+        self.label_map = label_map if label_map is not None else ETICHETE_IMPLICITE
+        self.id2label = model.config.id2label
+
+        # Versiunea intra in cheia cache-ului de rezultate
+        self.version = f"{EXTRACTOR_VERSION}.{HYBRID_VERSION}+{model_name}{'-int8' if quantize else ''}"
+
+        self._cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _camp(self, eticheta: str) -> Optional[str]:
+        eticheta = eticheta.upper()
+        for cheie, camp in self.label_map.items():
+            if cheie in eticheta:
+                return camp
+        return None
+
+    def _aggregate(self, sentence: str, offsets, label_ids, scores) -> List[Dict[str, Any]]:
+        """Grupeaza tokenii consecutivi cu aceeasi eticheta (echivalent aggregation_strategy="simple")"""
+        entitati = []
+        curent = None
+
+        for (start, end), label_id, score in zip(offsets, label_ids, scores):
+            if start == end:
+                # token special sau padding
+                continue
+            eticheta = self.id2label[label_id]
+            if eticheta == 'O':
+                curent = None
+                continue
+
+            if eticheta[:2] in ('B-', 'I-'):
+                prefix, tip = eticheta[0], eticheta[2:]
+            else:
+                prefix, tip = '', eticheta
+
+            # B- incepe o entitate noua, cu exceptia subtokenilor lipiti de cuvantul curent
+            if curent is not None and curent['entity_group'] == tip and (prefix != 'B' or start == curent['end']):
+                curent['end'] = end
+                curent['_scores'].append(score)
+            else:
+                curent = {'entity_group': tip, 'start': start, 'end': end, '_scores': [score]}
+                entitati.append(curent)
+
+        for entitate in entitati:
+            scores = entitate.pop('_scores')
+            entitate['score'] = sum(scores) / len(scores)
+            entitate['word'] = sentence[entitate['start']:entitate['end']]
+        return entitati
+
+    @torch.no_grad()
+    def _predict_batch(self, sentences: List[str]) -> List[List[Dict[str, Any]]]:
+        encoding = self.tokenizer(sentences, padding=True, truncation=True, max_length=self.max_length,
+                                  return_offsets_mapping=True, return_tensors="pt")
+        offsets = encoding.pop("offset_mapping").tolist()
+        inputs = {k: v.to(self.device) for k, v in encoding.items()}
+
+        logits = self.model(**inputs).logits
+        scores, label_ids = logits.softmax(dim=-1).max(dim=-1)
+        scores, label_ids = scores.tolist(), label_ids.tolist()
+
+        return [self._aggregate(sentence, offsets[i], label_ids[i], scores[i])
+                for i, sentence in enumerate(sentences)]
+
+    def predict_sentences(self, sentences: List[str]) -> List[List[Dict[str, Any]]]:
+        """Entitatile modelului pentru fiecare propozitie (pozitii relative la propozitie)"""
+        rezultate: List[Optional[List[Dict[str, Any]]]] = [None] * len(sentences)
+        lipsa: Dict[str, List[int]] = {}
+
+        for i, sentence in enumerate(sentences):
+            if sentence in self._cache:
+                self._cache.move_to_end(sentence)
+                rezultate[i] = self._cache[sentence]
+                self.cache_hits += 1
+            else:
+                lipsa.setdefault(sentence, []).append(i)
+
+        # Loturi de lungimi apropiate pentru a reduce padding-ul
+        noi = sorted(lipsa, key=len)
+        self.cache_misses += len(noi)
+        for b in range(0, len(noi), self.batch_size):
+            lot = noi[b:b + self.batch_size]
+            for sentence, entitati in zip(lot, self._predict_batch(lot)):
+                for i in lipsa[sentence]:
+                    rezultate[i] = entitati
+                self._cache[sentence] = entitati
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return rezultate
+
+    def extract_ml_entities(self, text: str) -> List[Dict[str, Any]]:
+        """Entitatile modelului pentru tot textul, cu pozitii absolute (start, end)"""
+        spans = split_sentences(text)
+        predictii = self.predict_sentences([text[start:end] for start, end in spans])
+
+        entitati = []
+        for (start, _), entitati_propozitie in zip(spans, predictii):
+            for entitate in entitati_propozitie:
+                if entitate['score'] < self.min_score:
+                    continue
+                entitati.append(dict(entitate, start=entitate['start'] + start, end=entitate['end'] + start))
+        return entitati
+
+    def extract_all_entities(self, text: str) -> FisaPacient:
+        return self._adauga_entitati_ml(super().extract_all_entities(text), text)
+
+    def reextract(self, previous_result: FisaPacient, edit_range: Tuple[int, int], new_text: str,
+                  margin: int = REEXTRACT_MARGIN) -> FisaPacient:
+        """Regulile sunt re-extrase incremental; propozitiile nemodificate vin din cache-ul modelului"""
+        fisa = super().reextract(previous_result, edit_range, new_text, margin)
+        return self._adauga_entitati_ml(fisa, new_text)
+
+    def _adauga_entitati_ml(self, fisa: FisaPacient, text: str) -> FisaPacient:
+        """Completeaza fisa (doar reguli) cu entitatile modelului care lipsesc"""
+        for camp in ('simptome', 'diagnostice', 'medicamente'):
+            fisa.pozitii.setdefault(camp, [])
+
+        simptome = {s.casefold() for s in fisa.simptome}
+        diagnostice = {d.casefold() for d in fisa.diagnostice}
+        medicamente = {m['nume'].casefold() for m in fisa.medicamente}
+
+        for entitate in self.extract_ml_entities(text):
+            camp = self._camp(entitate['entity_group'])
+            valoare = entitate['word'].strip(CAPETE_ENTITATE)
+            if camp is None or not valoare:
+                continue
+            start = entitate['start'] + entitate['word'].index(valoare)
+            end = start + len(valoare)
+
+            if camp == 'simptome' and valoare.casefold() not in simptome:
+                simptome.add(valoare.casefold())
+                fisa.simptome.append(valoare.capitalize())
+                fisa.pozitii[camp].append([start, end])
+            elif camp == 'diagnostice' and valoare.casefold() not in diagnostice:
+                diagnostice.add(valoare.casefold())
+                fisa.diagnostice.append(valoare.capitalize())
+                fisa.pozitii[camp].append([start, end])
+            elif camp == 'medicamente' and valoare.casefold() not in medicamente:
+                medicamente.add(valoare.casefold())
+                # Dozajul se cauta imediat dupa entitate, ca la regulile existente
+                # Doar textul de dupa entitate este normalizat (nu toata transcrierea)
+                dupa = text[entitate['end']:entitate['end'] + DOZAJ_CONTEXT].lower()
+                match = re.match(r'\s*(\d+\s*mg|\d+\s*g|o\s+tabletă|două\s+tablete)', dupa)
+                fisa.medicamente.append({
+                    'nume': valoare.capitalize(),
+                    'dozaj': match.group(1).strip() if match else 'nedefinit',
+                    'frecventa': 'conform prescripție'
+                })
+                fisa.pozitii[camp].append([start, entitate['end'] + match.end(1) if match else end])
+
+        if fisa.simptome or fisa.diagnostice:
+            fisa.observatii = [o for o in fisa.observatii if o != "Text neprocesabil - necesita revizuire manuala"]
+        return fisa
+
+    def clear_cache(self):
+        self._cache.clear()
+        self.cache_hits = self.cache_misses = 0
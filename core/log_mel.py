@@ -0,0 +1,113 @@
+"""
+Frontend log-mel pentru Whisper, pe loturi de segmente
+Calculeaza spectrogramele unui lot intreg intr-o singura trecere STFT (cadre + rfft), cu
+fereastra si banca de filtre mel calculate o singura data, in buffer-e prealocate; iesirea
+este un tensor prealocat (pinned daca modelul este pe GPU). Rezultatul corespunde
+WhisperFeatureExtractor (diferente de ordinul 1e-7).
+"""
+
+from typing import Sequence
+
+import numpy as np
+import torch
+
+
+class LogMelFrontend:
+    """Inlocuieste apelul processor(chunk_wave, ...) pentru loturi de segmente audio"""
+
+    def __init__(self, feature_extractor, device=None, max_batch: int = 1, pin_memory: bool = None):
+        """
+        Args:
+            feature_extractor: WhisperFeatureExtractor (de aici se iau n_fft, hop, numarul de
+                               benzi mel - 80 sau 128 la large-v3 - si banca de filtre)
+            device: Dispozitivul modelului; caracteristicile sunt calculate pe CPU si copiate acolo
+            max_batch: Dimensiunea initiala a buffer-elor (cresc automat la nevoie)
+            pin_memory: Buffer de iesire in memorie pinned (implicit: doar daca device este CUDA)
+        """
+        self.n_fft = feature_extractor.n_fft
+        self.hop_length = feature_extractor.hop_length
+        self.n_samples = feature_extractor.n_samples
+        self.n_mels = feature_extractor.feature_size
+        self.sampling_rate = feature_extractor.sampling_rate
+        self.n_frames = self.n_samples // self.hop_length
+
+        self.device = torch.device(device) if device is not None else torch.device("cpu")
+        self.pin_memory = self.device.type == "cuda" if pin_memory is None else pin_memory
+
+        # Constante: fereastra Hann si banca de filtre [n_mels, n_freq]
+        self.window = torch.hann_window(self.n_fft)
+        self.mel_filters = torch.from_numpy(np.ascontiguousarray(feature_extractor.mel_filters.T, dtype=np.float32))
+
+        self._wave = self._frames = self._spec = self._power = self._out = None
+        self._copie = None
+        self._reserve(max_batch)
+
+    @classmethod
+    def from_processor(cls, processor, device=None, **kwargs) -> "LogMelFrontend":
+        return cls(processor.feature_extractor, device=device, **kwargs)
+
+    def _reserve(self, batch: int):
+        """Buffer-ele intermediare sunt refolosite intre apeluri (fara alocari mari per segment)"""
+        if self._out is not None and self._out.shape[0] >= batch:
+            return
+        jumatate = self.n_fft // 2
+        n_freq = self.n_fft // 2 + 1
+        # Semnalul cu padding reflect de n_fft/2 la capete (center=True, ca torch.stft)
+        self._wave = torch.zeros(batch, self.n_samples + 2 * jumatate)
+        self._frames = torch.empty(batch, self.n_frames, self.n_fft)
+        self._spec = torch.empty(batch, self.n_frames, n_freq, dtype=torch.complex64)
+        self._power = torch.empty(batch, self.n_frames, n_freq)
+        self._out = torch.empty(batch, self.n_mels, self.n_frames, pin_memory=self.pin_memory)
+
+    @torch.no_grad()
+    def __call__(self, chunks: Sequence[np.ndarray]) -> torch.Tensor:
+        """
+        Caracteristicile log-mel [batch, n_mels, n_frames] pentru segmente mono la 16 kHz
+
+        Segmentele sunt completate cu zerouri (sau trunchiate) la 30 de secunde, ca in
+        WhisperFeatureExtractor. Pe CPU rezultatul este o vedere in buffer-ul intern,
+        valabila pana la urmatorul apel.
+        """
+        batch = len(chunks)
+        self._reserve(batch)
+        if self._copie is not None:
+            # Copierea asincrona anterioara inca foloseste buffer-ul pinned
+            self._copie.synchronize()
+
+        jumatate = self.n_fft // 2
+        n = self.n_samples
+        wave = self._wave[:batch]
+        for i, chunk in enumerate(chunks):
+            lungime = min(len(chunk), n)
+            wave[i, jumatate:jumatate + lungime] = torch.from_numpy(np.asarray(chunk[:lungime], dtype=np.float32))
+            wave[i, jumatate + lungime:jumatate + n] = 0
+        wave[:, :jumatate] = wave[:, jumatate + 1:2 * jumatate + 1].flip(-1)
+        wave[:, jumatate + n:] = wave[:, n - 1:jumatate + n - 1].flip(-1)
+
+        # STFT pe tot lotul: cadre suprapuse (vedere, fara copie) * fereastra, apoi rfft.
+        # Ultimul cadru al torch.stft nu este folosit de Whisper, deci nu se calculeaza.
+        frames = self._frames[:batch]
+        torch.mul(wave.unfold(-1, self.n_fft, self.hop_length)[:, :self.n_frames], self.window, out=frames)
+        spec = self._spec[:batch]
+        torch.fft.rfft(frames, out=spec)
+
+        # |X|^2 = re^2 + im^2
+        parti = torch.view_as_real(spec)
+        power = self._power[:batch]
+        torch.mul(parti[..., 0], parti[..., 0], out=power)
+        power.addcmul_(parti[..., 1], parti[..., 1])
+
+        out = self._out[:batch]
+        torch.matmul(self.mel_filters, power.transpose(1, 2), out=out)
+        out.clamp_(min=1e-10).log10_()
+        # Gama dinamica limitata la 8 (log10) sub maximul fiecarui segment
+        torch.maximum(out, out.amax(dim=(1, 2), keepdim=True) - 8.0, out=out)
+        out.add_(4.0).div_(4.0)
+
+        if self.device.type == "cpu":
+            return out
+        features = out.to(self.device, non_blocking=self.pin_memory)
+        if self.pin_memory and self.device.type == "cuda":
+            self._copie = torch.cuda.Event()
+            self._copie.record()
+        return features
@@ -6,16 +6,53 @@ pana la implementarea unui model NER fine-tuned pe date medicale.
 
 import re
 import json
-from typing import Dict, List, Any
-from dataclasses import dataclass, asdict
+from functools import cached_property, partial
+from typing import Dict, List, Any, Callable, Tuple
+from dataclasses import dataclass, asdict, field
 import inflect
+import numpy as np
 
-@dataclass
+# Versiunea regulilor de extractie; se incrementeaza la orice modificare care schimba rezultatele
+# (invalideaza fisele din cache-ul de rezultate fara a rerula ASR-ul)
+EXTRACTOR_VERSION = "2"
+
+# Contextul rescanat de reextract() de fiecare parte a editarii; trebuie sa depaseasca
+# lungimea celei mai lungi entitati (structura + separator + valoare + unitate)
+REEXTRACT_MARGIN = 128
+
+@dataclass(slots=True)
 class MasuratoareEcografica:
     """Structură pentru o măsurătoare ecografică"""
     structura_anatomica: str
     valoare_numerica: float
     unitate_masura: str = "mm"
+    tip_masurare: str = "ecografie_cardiaca"
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "MasuratoareEcografica":
+        return cls(d['structura_anatomica'], d['valoare_numerica'], d['unitate_masura'], d['tip_masurare'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'structura_anatomica': self.structura_anatomica,
+            'valoare_numerica': self.valoare_numerica,
+            'unitate_masura': self.unitate_masura,
+            'tip_masurare': self.tip_masurare
+        }
+
+@dataclass(slots=True)
+class Medicament:
+    """Un medicament extras (forma compacta a dictionarului din FisaPacient.medicamente)"""
+    nume: str
+    dozaj: str = "nedefinit"
+    frecventa: str = "conform prescripție"
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, str]) -> "Medicament":
+        return cls(d['nume'], d['dozaj'], d['frecventa'])
+
+    def to_dict(self) -> Dict[str, str]:
+        return {'nume': self.nume, 'dozaj': self.dozaj, 'frecventa': self.frecventa}
 
 @dataclass
 class FisaPacient:
@@ -24,9 +61,121 @@ class FisaPacient:
     diagnostice: List[str]
     medicamente: List[Dict[str, str]]
     observatii: List[str]
+    # Pozitiile [start, end] in transcriere ale entitatilor, aliniate cu listele de mai sus
+    pozitii: Dict[str, List[List[int]]] = field(default_factory=dict)
+
+    def __getattr__(self, name):
+        # Dupa extractie, `pozitii` se construieste la primul acces din randurile indexului
+        # (o lista Python per entitate); re-extractiile succesive nu platesc aceasta conversie
+        randuri = self.__dict__.get('_randuri_pozitii')
+        if name != 'pozitii' or randuri is None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        del self._randuri_pozitii
+        self.pozitii = self._index.pozitii(randuri)
+        return self.pozitii
+
+
+@dataclass
+class IndexExtractie:
+    """
+    Toate potrivirile regulilor (pozitii absolute), folosite de re-extractia incrementala
+    Un singur tabel columnar, cu randurile sortate dupa (regula, start): dupa o editare,
+    deplasarea pozitiilor este o singura operatie vectorizata, iar FisaPacient se construieste
+    din felii contigue, fara a parcurge in Python fiecare aparitie.
+    """
+    text: str
+    reguli: tuple
+    regula: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+    # (n, 2): [start, end] ale entitatii fiecarei potriviri; -1 pentru potrivirile fara entitate
+    spans: np.ndarray
+    # Doar entitatile potrivirilor valide, in ordinea randurilor
+    items: List[Any]
+    # False daca lower() schimba lungimea textului: pozitiile nu pot fi actualizate incremental
+    incremental: bool = True
+
+    @cached_property
+    def limite(self) -> np.ndarray:
+        """Randurile regulii r sunt [limite[r], limite[r + 1])"""
+        return np.searchsorted(self.regula, np.arange(len(self.reguli) + 1))
+
+    @cached_property
+    def valide(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Masca potrivirilor cu entitate si indexul in `items` al fiecarui rand (prefix cumulat)"""
+        valid = self.spans[:, 0] >= 0
+        return valid, np.concatenate([[0], np.cumsum(valid)])
+
+    def pozitii(self, randuri: Dict[str, List[Tuple[int, int]]]) -> Dict[str, List[List[int]]]:
+        """FisaPacient.pozitii din intervalele de randuri [lo, hi) ale fiecarui camp (doar randurile valide)"""
+        valid = self.valide[0]
+        return {camp: np.concatenate([self.spans[lo:hi][valid[lo:hi]] for lo, hi in intervale]).tolist()
+                if intervale else [] for camp, intervale in randuri.items()}
+
+
+class _TextNormalizat:
+    """Textul cu litere mici, calculat doar pe intervalele rescanate (nu pe toata transcrierea)"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.start = self.end = 0
+        self.norm = ''
+
+    def interval(self, start: int, end: int) -> Tuple[str, int]:
+        """Textul normalizat care acopera [start, end) si pozitia lui de inceput"""
+        if start < self.start or end > self.end or not self.norm:
+            if self.norm:
+                start, end = min(start, self.start), max(end, self.end)
+            norm = self.text[start:end].lower()
+            if len(norm) != end - start:
+                raise ValueError("lower() a schimbat lungimea textului")
+            self.start, self.end, self.norm = start, end, norm
+        return self.norm, self.start
+
+
+def _coloane(regula: int, aparitii: List[Tuple[int, int, Tuple[Any, int, int]]]):
+    """(regula, starts, ends, spans, items) pentru aparitiile unei reguli"""
+    starts = np.array([a[0] for a in aparitii], dtype=np.int64)
+    ends = np.array([a[1] for a in aparitii], dtype=np.int64)
+    spans = np.full((len(aparitii), 2), -1, dtype=np.int64)
+    items = []
+    for j, (start, _, (entitate, rel_start, rel_end)) in enumerate(aparitii):
+        if entitate is not None:
+            spans[j] = (start + rel_start, start + rel_end)
+            items.append(entitate)
+    return np.full(len(aparitii), regula, dtype=np.int32), starts, ends, spans, items
+
+
+def _identice(aparitii, starts, ends, spans, items, pozitie_item, i: int) -> bool:
+    """Aparitiile rescanate sunt exact randurile [i, i + len(aparitii)) (pozitii deja deplasate)"""
+    for j, (start, end, (entitate, rel_start, rel_end)) in enumerate(aparitii, i):
+        if start != starts[j] or end != ends[j]:
+            return False
+        if entitate is None:
+            if spans[j, 0] >= 0:
+                return False
+        elif (spans[j, 0] != start + rel_start or spans[j, 1] != start + rel_end
+              or items[pozitie_item[j]] != entitate):
+            return False
+    return True
+
+
+def _concateneaza(text: str, reguli: tuple, bucati: List[tuple], incremental: bool = True) -> IndexExtractie:
+    """IndexExtractie din bucati (regula, starts, ends, spans, items), deja in ordinea randurilor"""
+    if not bucati:
+        bucati = [_coloane(0, [])]
+    items = []
+    for bucata in bucati:
+        items.extend(bucata[4])
+    return IndexExtractie(text, reguli, *(np.concatenate([b[c] for b in bucati]) for c in range(4)), items,
+                          incremental=incremental)
+
 
 class MedicalEntityExtractor:
 
+    # Intra in cheia cache-ului de rezultate (extractoarele derivate o suprascriu)
+    version = EXTRACTOR_VERSION
+
     def __init__(self):
         # Dicționar pentru conversia numerelor în cifre
         self.numere_text_to_cifre = {
@@ -70,6 +219,8 @@ class MedicalEntityExtractor:
             'palpitații', 'amețeli', 'oboseală', 'cefalee', 'tuse', 'febră'
         ]
 
+        self._reguli_compilate = None
+
     def text_to_number(self, text: str) -> float:
         text = text.lower().strip()
 
@@ -95,98 +246,282 @@ class MedicalEntityExtractor:
 
         return None
 
-    def extract_masuratori_ecografice(self, text: str) -> List[Dict[str, Any]]:
-        masuratori = []
+    def _reguli(self) -> Tuple[Tuple[str, "re.Pattern", Callable], ...]:
+        """
+        Regulile compilate, in ordinea in care apar entitatile in FisaPacient
 
-        # Normalizare text
-        text_norm = text.lower()
+        Se recompileaza doar daca listele de pattern-uri au fost modificate.
+        """
+        cheie = (tuple(self.structuri_anatomice_cardio), tuple(self.medicamente_comune), tuple(self.simptome_comune))
+        if self._reguli_compilate is not None and self._reguli_compilate[0] == cheie:
+            return self._reguli_compilate[1]
 
+        reguli = []
         # Pattern 1: "structura, număr" (ex: "aorta la inel, opt")
         for pattern in self.structuri_anatomice_cardio:
-            # Caută pattern-ul urmat de virgulă și număr
-            regex = rf'({pattern})[,:\s]+([a-zăâîșț]+|\d+(?:[.,]\d+)?)\s*(mm|cm|m)?'
-            matches = re.finditer(regex, text_norm, re.IGNORECASE)
+            regex = re.compile(rf'({pattern})[,:\s]+([a-zăâîșț]+|\d+(?:[.,]\d+)?)\s*(mm|cm|m)?', re.IGNORECASE)
+            reguli.append(('masuratori_ecografice', regex, self._masurare))
+        for medicament in self.medicamente_comune:
+            # Caută dozaj în apropiere
+            regex = re.compile(rf'{medicament}\s*(\d+\s*mg|\d+\s*g|o\s+tabletă|două\s+tablete)?')
+            reguli.append(('medicamente', regex, partial(self._medicament, medicament)))
+        for simptom in self.simptome_comune:
+            reguli.append(('simptome', re.compile(re.escape(simptom)), partial(self._simptom, simptom)))
+        reguli.append(('diagnostice', re.compile(r'diagnostic[:\s]+([^.]+)'), self._diagnostic))
+
+        self._reguli_compilate = (cheie, tuple(reguli))
+        return self._reguli_compilate[1]
+
+    # Fiecare convertor intoarce (entitate, start, end) cu pozitiile relative la inceputul potrivirii;
+    # entitate None inseamna o potrivire care nu produce nimic (ex: valoare nenumerica)
+
+    def _masurare(self, match: "re.Match") -> Tuple[Any, int, int]:
+        valoare = self.text_to_number(match.group(2).strip())
+        if valoare is None:
+            return None, 0, 0
+        return {
+            'structura_anatomica': match.group(1).strip(),
+            'valoare_numerica': valoare,
+            'unitate_masura': match.group(3) if match.group(3) else 'mm',
+            'tip_masurare': 'ecografie_cardiaca'
+        }, 0, match.end() - match.start()
+
+    def _medicament(self, nume: str, match: "re.Match") -> Tuple[Any, int, int]:
+        dozaj = match.group(1) if match.group(1) else 'nedefinit'
+        end = match.end(1) if match.group(1) else match.start() + len(nume)
+        return {
+            'nume': nume.capitalize(),
+            'dozaj': dozaj.strip(),
+            'frecventa': 'conform prescripție'
+        }, 0, end - match.start()
+
+    def _simptom(self, simptom: str, match: "re.Match") -> Tuple[Any, int, int]:
+        return simptom.capitalize(), 0, match.end() - match.start()
+
+    def _diagnostic(self, match: "re.Match") -> Tuple[Any, int, int]:
+        valoare = match.group(1)
+        start = match.start(1) + len(valoare) - len(valoare.lstrip())
+        end = match.end(1) - (len(valoare) - len(valoare.rstrip()))
+        return valoare.strip().capitalize(), start - match.start(), max(start, end) - match.start()
+
+    def _scan(self, regula, text_norm: str, pos: int = 0, endpos: int = None, offset: int = 0):
+        """Toate potrivirile unei reguli ca (start, end, (entitate, start_rel, end_rel))"""
+        _, regex, convert = regula
+        matches = regex.finditer(text_norm, pos) if endpos is None else regex.finditer(text_norm, pos, endpos)
+        for match in matches:
+            yield match.start() + offset, match.end() + offset, convert(match)
 
-            for match in matches:
-                structura = match.group(1).strip()
-                valoare_text = match.group(2).strip()
-                unitate = match.group(3) if match.group(3) else 'mm'
+    def _indexeaza(self, text: str, campuri=None) -> IndexExtractie:
+        """Scaneaza textul cu toate regulile (sau doar cu cele ale campurilor date)"""
+        text_norm = text.lower()
+        reguli = self._reguli()
+        bucati = [_coloane(r, list(self._scan(regula, text_norm))) for r, regula in enumerate(reguli)
+                  if campuri is None or regula[0] in campuri]
+        return _concateneaza(text, reguli, bucati, incremental=len(text_norm) == len(text))
+
+    def _agrega(self, index: IndexExtractie) -> FisaPacient:
+        """Construieste FisaPacient din aparitiile indexate (aceeasi ordine ca extractia clasica)"""
+        rezultat = {camp: [] for camp in ('masuratori_ecografice', 'simptome', 'diagnostice', 'medicamente')}
+        randuri = {camp: [] for camp in rezultat}
+        limite = index.limite.tolist()
+        valid, pozitie_item = index.valide
+
+        r = 0
+        while r < len(index.reguli):
+            # Regulile aceluiasi camp sunt consecutive: randurile lor formeaza o felie contigua
+            camp = index.reguli[r][0]
+            r_end = r + 1
+            while r_end < len(index.reguli) and index.reguli[r_end][0] == camp:
+                r_end += 1
+            if camp in ('medicamente', 'simptome'):
+                # Doar prima aparitie a fiecarui medicament / simptom
+                for lo, hi in zip(limite[r:r_end], limite[r + 1:r_end + 1]):
+                    if hi > lo and valid[lo]:
+                        rezultat[camp].append(index.items[pozitie_item[lo]])
+                        randuri[camp].append((lo, lo + 1))
+            else:
+                lo, hi = limite[r], limite[r_end]
+                rezultat[camp].extend(index.items[pozitie_item[lo]:pozitie_item[hi]])
+                randuri[camp].append((lo, hi))
+            r = r_end
 
-                # Convertește valoarea în număr
-                valoare = self.text_to_number(valoare_text)
+        # Observații generale (restul textului care nu s-a potrivit)
+        observatii = []
+        if not rezultat['masuratori_ecografice'] and not rezultat['simptome'] and not rezultat['diagnostice']:
+            observatii.append("Text neprocesabil - necesita revizuire manuala")
 
-                if valoare is not None:
-                    masuratori.append({
-                        'structura_anatomica': structura,
-                        'valoare_numerica': valoare,
-                        'unitate_masura': unitate,
-                        'tip_masurare': 'ecografie_cardiaca'
-                    })
+        fisa = FisaPacient(observatii=observatii, **rezultat)
+        # Indexul si randurile pozitiilor nu fac parte din JSON (asdict ignora atributele care nu
+        # sunt campuri); `pozitii` este calculat de FisaPacient.__getattr__ la primul acces
+        del fisa.pozitii
+        fisa._randuri_pozitii = randuri
+        fisa._index = index
+        return fisa
 
-        return masuratori
+    def extract_masuratori_ecografice(self, text: str) -> List[Dict[str, Any]]:
+        return self._agrega(self._indexeaza(text, {'masuratori_ecografice'})).masuratori_ecografice
 
     def extract_medicamente(self, text: str) -> List[Dict[str, str]]:
-        medicamente = []
-        text_norm = text.lower()
-
-        for medicament in self.medicamente_comune:
-            if medicament in text_norm:
-                # Caută dozaj în apropiere
-                pattern = rf'{medicament}\s*(\d+\s*mg|\d+\s*g|o\s+tabletă|două\s+tablete)?'
-                match = re.search(pattern, text_norm)
-
-                if match:
-                    dozaj = match.group(1) if match.group(1) else 'nedefinit'
-                    medicamente.append({
-                        'nume': medicament.capitalize(),
-                        'dozaj': dozaj.strip(),
-                        'frecventa': 'conform prescripție'
-                    })
-
-        return medicamente
+        return self._agrega(self._indexeaza(text, {'medicamente'})).medicamente
 
     def extract_simptome(self, text: str) -> List[str]:
-        simptome = []
-        text_norm = text.lower()
-
-        for simptom in self.simptome_comune:
-            if simptom in text_norm:
-                simptome.append(simptom.capitalize())
-
-        return simptome
+        return self._agrega(self._indexeaza(text, {'simptome'})).simptome
 
     def extract_diagnostice(self, text: str) -> List[str]:
-        diagnostice = []
-        text_norm = text.lower()
-
-        # Pattern-uri pentru diagnostice comune
-        pattern_diagnostic = r'diagnostic[:\s]+([^.]+)'
-        matches = re.finditer(pattern_diagnostic, text_norm)
-
-        for match in matches:
-            diagnostic = match.group(1).strip()
-            diagnostice.append(diagnostic.capitalize())
-
-        return diagnostice
+        return self._agrega(self._indexeaza(text, {'diagnostice'})).diagnostice
 
     def extract_all_entities(self, text: str) -> FisaPacient:
-        masuratori = self.extract_masuratori_ecografice(text)
-        simptome = self.extract_simptome(text)
-        diagnostice = self.extract_diagnostice(text)
-        medicamente = self.extract_medicamente(text)
-
-        # Observații generale (restul textului care nu s-a potrivit)
-        observatii = []
-        if not masuratori and not simptome and not diagnostice:
-            observatii.append("Text neprocesabil - necesita revizuire manuala")
-
-        return FisaPacient(
-            masuratori_ecografice=masuratori,
-            simptome=simptome,
-            diagnostice=diagnostice,
-            medicamente=medicamente,
-            observatii=observatii
-        )
+        """Extrage toate entitatile; `pozitii` contine (start, end) in text pentru fiecare entitate"""
+        return self._agrega(self._indexeaza(text))
+
+    def reextract(self, previous_result: FisaPacient, edit_range: Tuple[int, int], new_text: str,
+                  margin: int = REEXTRACT_MARGIN) -> FisaPacient:
+        """
+        Re-extractie incrementala dupa o editare a transcrierii
+
+        Rescaneaza doar fereastra editata plus `margin` caractere de context si pastreaza
+        (cu pozitiile deplasate) restul aparitiilor; rezultatul este identic cu
+        extract_all_entities(new_text) atata timp cat nicio entitate nu este mai lunga decat
+        `margin` (diagnosticele, care se intind pana la punct, sunt tratate separat).
+        Munca in Python depinde doar de fereastra: ferestrele tuturor regulilor si deplasarea
+        pozitiilor sunt operatii vectorizate, regulile ale caror aparitii nu se schimba nu
+        reconstruiesc tabelul, iar `pozitii` devine liste Python abia la primul acces. Raman
+        proportionale cu numarul de entitati doar aceste operatii numpy si copierea listelor de
+        entitati (referinte, fara obiecte noi).
+
+        Args:
+            previous_result: Rezultatul anterior (extract_all_entities sau reextract)
+            edit_range: (start, end) - intervalul din textul VECHI inlocuit prin editare
+            new_text: Textul complet dupa editare
+            margin: Contextul rescanat de fiecare parte a editarii
+        """
+        index = getattr(previous_result, '_index', None)
+        if index is None or index.reguli is not self._reguli() or not index.incremental:
+            # Rezultat incarcat din JSON/cache sau reguli modificate: extractie completa
+            return self._agrega(self._indexeaza(new_text))
+
+        start, end = edit_range
+        old_len = len(index.text)
+        delta = len(new_text) - old_len
+        if not 0 <= start <= end <= old_len or end + delta < start:
+            raise ValueError(f"Interval de editare invalid: {edit_range} (text de {old_len} caractere)")
+
+        reguli = index.reguli
+        limite = index.limite
+        lo, hi = limite[:-1], limite[1:]
+
+        # Fereastra fiecarei reguli, in coordonatele textului vechi; un diagnostic se intinde
+        # pana la primul punct, deci poate incepe oriunde dupa punctul anterior
+        ws = np.full(len(reguli), max(0, start - margin), dtype=np.int64)
+        we = np.full(len(reguli), min(old_len, end + margin), dtype=np.int64)
+        pana_la_punct = np.array([regula[0] == 'diagnostice' for regula in reguli])
+        ws[pana_la_punct] = np.minimum(ws[pana_la_punct], new_text.rfind('.', 0, start) + 1)
+
+        # Primul rand care se termina dupa fereastra si primul care incepe dupa ea, pentru toate
+        # regulile odata: cheile (regula, pozitie) sunt sortate in tot tabelul
+        pas = old_len + 1
+        cheie = index.regula.astype(np.int64) * pas
+        baza = np.arange(len(reguli), dtype=np.int64) * pas
+        i = (cheie + index.ends).searchsorted(baza + ws, 'right')
+        k = (cheie + index.starts).searchsorted(baza + we, 'left')
+        if len(index.starts):
+            # Aparitiile care intersecteaza marginile ferestrei sunt rescanate integral
+            ws = np.where(i < hi, np.minimum(ws, index.starts[np.minimum(i, len(index.starts) - 1)]), ws)
+            we = np.where(k > lo, np.maximum(we, index.ends[np.maximum(k - 1, 0)]), we)
+
+        # Aparitiile pastrate de dupa editare sunt deplasate cu delta, toate odata; cele dinainte
+        # se termina inaintea ferestrei, deci start < end pentru ele
+        valid, pozitie_item = index.valide
+        deplasat = index.starts >= end
+        starts = index.starts + delta * deplasat
+        ends = index.ends + delta * deplasat
+        spans = index.spans + (delta * (deplasat & valid))[:, None]
+
+        # Doar ferestrele rescanate sunt trecute prin lower(), nu toata transcrierea
+        text_norm = _TextNormalizat(new_text)
+        bucati_noi = []
+        try:
+            for r, regula, i_r, k_r, ws_r, we_r, hi_r in zip(range(len(reguli)), reguli, i.tolist(), k.tolist(),
+                                                             ws.tolist(), we.tolist(), hi.tolist()):
+                k_r, aparitii = self._rescaneaza(regula, index.starts, index.ends, text_norm, ws_r, we_r, k_r, hi_r,
+                                                 delta, margin)
+                if k_r == i_r and not aparitii:
+                    continue
+                if k_r - i_r == len(aparitii) and _identice(aparitii, starts, ends, spans, index.items,
+                                                            pozitie_item, i_r):
+                    # Editarea nu a schimbat aparitiile regulii (cazul obisnuit)
+                    continue
+                bucati_noi.append((i_r, k_r, _coloane(r, aparitii)))
+        except ValueError:
+            # lower() a schimbat lungimea (caractere Unicode rare): pozitiile nu mai corespund
+            return self._agrega(self._indexeaza(new_text))
+
+        if not bucati_noi:
+            # Aceleasi aparitii, doar deplasate: tabelul nou reia coloanele fara concatenare
+            return self._agrega(IndexExtractie(new_text, reguli, index.regula, starts, ends, spans, index.items))
+
+        bucati = []
+        rand = 0
+        for i_r, k_r, noi in bucati_noi:
+            # Randurile neschimbate dintre ferestre, apoi aparitiile rescanate
+            bucati.append((index.regula[rand:i_r], starts[rand:i_r], ends[rand:i_r], spans[rand:i_r],
+                           index.items[pozitie_item[rand]:pozitie_item[i_r]]))
+            bucati.append(noi)
+            rand = k_r
+        bucati.append((index.regula[rand:], starts[rand:], ends[rand:], spans[rand:],
+                       index.items[pozitie_item[rand]:]))
+
+        return self._agrega(_concateneaza(new_text, reguli, bucati))
+
+    def _rescaneaza(self, regula, starts, ends, text_norm, ws, we, k, hi, delta, margin):
+        """
+        Rescaneaza fereastra [ws, we) (coordonatele textului vechi) pentru o regula
+
+        Returns:
+            (k, aparitii): aparitiile vechi pana la randul k (exclusiv) sunt inlocuite cu `aparitii`
+        """
+        text = text_norm.text
+        n = len(text)
+        pana_la_punct = regula[0] == 'diagnostice'
+        we_new = we + delta
+
+        def limita(we_new):
+            if pana_la_punct:
+                punct = text.find('.', we_new)
+                return n if punct < 0 else punct + 1
+            return min(n, we_new + margin)
+
+        aparitii = []
+        pos = ws
+        endpos = limita(we_new)
+        while True:
+            reia = False
+            norm, offset = text_norm.interval(pos, endpos)
+            for m_start, m_end, item in self._scan(regula, norm, pos - offset, endpos - offset, offset):
+                if m_start >= we_new:
+                    break
+                if m_end >= endpos and endpos < n:
+                    # Potrivirea poate fi taiata de endpos: se rescaneaza pana la final
+                    endpos = n
+                    reia = True
+                    break
+                aparitii.append((m_start, m_end, item))
+                pos = m_end
+                if m_end > we_new:
+                    # Potrivirea noua acopera aparitii vechi din dreapta ferestrei
+                    we_new = m_end
+                    while k < hi and starts[k] + delta < we_new:
+                        k += 1
+                        if ends[k - 1] + delta > we_new:
+                            we_new = int(ends[k - 1]) + delta
+                    if limita(we_new) > endpos:
+                        endpos = limita(we_new)
+                        reia = True
+                        break
+            if not reia:
+                break
+
+        return k, aparitii
 
     def to_fhir_observation(self, masuratori: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         fhir_observations = []
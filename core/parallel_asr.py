@@ -0,0 +1,256 @@
+"""
+Transcriere Whisper pe CPU cu mai multe procese care partajeaza aceleasi greutati
+Procesele worker sunt pornite dupa incarcarea modelului: cu fork paginile greutatilor
+raman comune (copy-on-write, niciodata scrise), iar cu spawn greutatile sunt mutate in
+memorie partajata (share_memory_) si transmise prin handle-uri, nu copiate.
+Segmentele uneia sau mai multor inregistrari sunt distribuite workerilor printr-o coada
+comuna; rezultatele sunt reasamblate in ordine pentru fiecare cerere.
+"""
+
+import itertools
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from core.audio_stream import stream_chunks
+from core.whisper_transcriber import WhisperTranscriber
+
+logger = logging.getLogger(__name__)
+
+
+def _worker(model, processor, transcriber_kwargs, threads, tasks, results):
+    """Bucla unui proces worker: (job, index, segment) -> (job, index, text, escaladat, eroare)"""
+    torch.set_num_threads(threads)
+    transcriber = WhisperTranscriber(model, processor, torch.device("cpu"), **transcriber_kwargs)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job, index, chunk_wave = task
+        try:
+            # Motivul escaladarii (beam adaptiv) ajunge in procesul parinte, care il raporteaza
+            rezultat = transcriber.decode_batch([chunk_wave])[0]
+            results.put((job, index, rezultat["text"], rezultat.get("escaladat"), None))
+        except Exception as e:
+            results.put((job, index, None, None, f"{type(e).__name__}: {e}"))
+
+
+class ParallelTranscriber:
+    """
+    Executor ASR multi-proces (doar CPU)
+
+    Poate fi apelat simultan din mai multe thread-uri (ex: cererile serverului);
+    segmentele tuturor cererilor impart aceiasi workeri.
+    """
+
+    def __init__(self, model, processor, num_workers: int = None, threads_per_worker: int = None,
+                 start_method: str = None, chunk_sec: float = 30, **transcriber_kwargs):
+        """
+        Args:
+            model: WhisperForConditionalGeneration incarcat pe CPU
+            processor: WhisperProcessor corespunzator
+            num_workers: Numarul de procese (implicit: numarul de nuclee)
+            threads_per_worker: Thread-uri torch per proces (implicit: nuclee / workeri)
+            start_method: "fork" (implicit unde exista) sau "spawn"
+            chunk_sec: Durata unui segment audio
+            transcriber_kwargs: Parametrii de decodare pentru WhisperTranscriber (num_beams, ...)
+        """
+        if next(model.parameters()).device.type != "cpu":
+            raise ValueError("ParallelTranscriber ruleaza doar pe CPU (modelul este pe alt dispozitiv)")
+
+        cpu = os.cpu_count() or 1
+        self.num_workers = num_workers or cpu
+        self.threads_per_worker = threads_per_worker or max(1, cpu // self.num_workers)
+        self.chunk_sec = chunk_sec
+        self.adaptive = transcriber_kwargs.get("adaptive")
+        # Contoare cumulate pentru beam-ul adaptiv (actualizate din rezultatele workerilor)
+        self.segmente_decodate = 0
+        self.segmente_escaladate = 0
+        if start_method is None:
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        self.start_method = start_method
+
+        model.eval()
+        if start_method != "fork":
+            # Fara fork, greutatile ajung la workeri prin memorie partajata (nu prin copiere)
+            model.share_memory()
+
+        # Folosit doar pentru parametrii de decodare (cheia cache-ului)
+        self.decoding_params = WhisperTranscriber(model, processor, torch.device("cpu"), chunk_sec=chunk_sec,
+                                                  **transcriber_kwargs).decoding_params
+        self.num_beams = self.decoding_params["num_beams"]
+
+        ctx = mp.get_context(start_method)
+        # Coada de segmente este limitata: inregistrarile lungi nu sunt decodate integral in memorie
+        self._tasks = ctx.Queue(maxsize=2 * self.num_workers)
+        self._results = ctx.Queue()
+        self._workers = [
+            ctx.Process(target=_worker, daemon=True,
+                        args=(model, processor, dict(transcriber_kwargs, chunk_sec=chunk_sec),
+                              self.threads_per_worker, self._tasks, self._results))
+            for _ in range(self.num_workers)
+        ]
+        for proces in self._workers:
+            proces.start()
+
+        self._jobs: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._closed = False
+        self._eroare = None
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    @property
+    def pids(self) -> List[int]:
+        return [proces.pid for proces in self._workers]
+
+    def _finalizeaza(self, job: int):
+        """Apelat cu lock-ul luat: completeaza Future-ul daca toate segmentele au revenit"""
+        stare = self._jobs[job]
+        if stare['total'] is None or len(stare['texte']) < stare['total']:
+            return
+        del self._jobs[job]
+        if self.adaptive is not None:
+            logger.info("Job %d: %d/%d segmente escaladate la beam %d",
+                        job, stare['escaladate'], stare['total'], self.num_beams)
+        if stare['erori']:
+            stare['future'].set_exception(RuntimeError("; ".join(stare['erori'])))
+        else:
+            stare['future'].set_result([stare['texte'][i] for i in range(stare['total'])])
+
+    def _collect(self):
+        """Thread care preia rezultatele workerilor si le distribuie cererilor"""
+        while not self._closed:
+            try:
+                job, index, text, escaladat, eroare = self._results.get(timeout=1)
+            except queue.Empty:
+                if not all(proces.is_alive() for proces in self._workers):
+                    self._esueaza_toate("un proces worker s-a oprit neasteptat")
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+
+            with self._lock:
+                stare = self._jobs.get(job)
+                if stare is None:
+                    continue
+                stare['texte'][index] = text
+                if self.adaptive is not None and eroare is None:
+                    self.segmente_decodate += 1
+                if escaladat:
+                    self.segmente_escaladate += 1
+                    stare['escaladate'] += 1
+                    logger.info("Job %d, chunk %d escaladat la beam %d: %s", job, index, self.num_beams, escaladat)
+                if eroare is not None:
+                    stare['erori'].append(f"segment {index}: {eroare}")
+                self._finalizeaza(job)
+
+    def _esueaza_toate(self, motiv: str):
+        # Eroarea se seteaza sub lock: submit() nu mai poate inregistra joburi dupa clear()
+        with self._lock:
+            self._eroare = motiv
+            for stare in self._jobs.values():
+                stare['future'].set_exception(RuntimeError(motiv))
+            self._jobs.clear()
+
+    def submit(self, chunks: Iterable[np.ndarray]) -> Future:
+        """
+        Trimite segmentele (pot veni dintr-un generator) catre workeri
+
+        Returns:
+            Future cu lista textelor, in ordinea segmentelor
+        """
+        job = next(self._job_ids)
+        future = Future()
+        with self._lock:
+            if self._closed or self._eroare:
+                raise RuntimeError(self._eroare or "ParallelTranscriber a fost inchis")
+            self._jobs[job] = {'texte': {}, 'total': None, 'erori': [], 'escaladate': 0, 'future': future}
+
+        total = 0
+        try:
+            for index, chunk_wave in enumerate(chunks):
+                self._put((job, index, np.ascontiguousarray(chunk_wave, dtype=np.float32)))
+                total += 1
+        except Exception as e:
+            with self._lock:
+                self._jobs.pop(job, None)
+            # Future-ul poate fi deja esuat de _esueaza_toate() (un worker s-a oprit)
+            if not future.done():
+                future.set_exception(e)
+            return future
+
+        with self._lock:
+            if job in self._jobs:
+                self._jobs[job]['total'] = total
+                self._finalizeaza(job)
+        return future
+
+    def _put(self, task):
+        # Coada plina: se asteapta workerii, dar nu la nesfarsit daca unul a cazut
+        while not self._eroare:
+            try:
+                self._tasks.put(task, timeout=1)
+                return
+            except queue.Full:
+                pass
+        raise RuntimeError(self._eroare)
+
+    def transcribe_chunks(self, chunks: Iterable[np.ndarray]) -> List[str]:
+        """Textul fiecarui segment, in ordine"""
+        return self.submit(chunks).result()
+
+    def transcribe(self, audio_path: str, verbose: bool = False) -> str:
+        """Transcrie o inregistrare: segmentele ei sunt procesate in paralel"""
+        return " ".join(text for text in self.transcribe_chunks(stream_chunks(audio_path, self.chunk_sec)) if text)
+
+    def transcribe_many(self, audio_paths: Iterable[str]) -> List[str]:
+        """Transcrie mai multe inregistrari; segmentele tuturor sunt distribuite impreuna"""
+        futures = [self.submit(stream_chunks(path, self.chunk_sec)) for path in audio_paths]
+        return [" ".join(text for text in future.result() if text) for future in futures]
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # Un worker oprit nu mai goleste coada: sentinelele se trimit cu timeout, iar daca
+        # coada ramane plina workerii ramasi sunt opriti direct (put() ar astepta la nesfarsit)
+        trimise = 0
+        while trimise < len(self._workers):
+            try:
+                self._tasks.put(None, timeout=1)
+                trimise += 1
+            except queue.Full:
+                if not all(proces.is_alive() for proces in self._workers):
+                    break
+        # Un worker omorat in timpul get() poate lasa lock-ul cozii luat: ceilalti nu mai primesc
+        # sentinelele, deci dupa o cadere workerii sunt opriti direct, fara join de 30 s
+        opriti = trimise < len(self._workers) or not all(proces.is_alive() for proces in self._workers)
+        for proces in self._workers:
+            if opriti:
+                proces.terminate()
+            proces.join(timeout=30)
+            if proces.is_alive():
+                proces.terminate()
+        if opriti:
+            # Segmentele ramase in buffer nu mai au cititor; iesirea nu asteapta trimiterea lor
+            self._tasks.cancel_join_thread()
+        self._collector.join()
+        if self._jobs:
+            self._esueaza_toate("ParallelTranscriber a fost inchis")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,118 @@
+"""
+Memoria folosita de un proces si de copiii lui (RSS, PSS si USS)
+PSS imparte paginile partajate intre procesele care le folosesc, iar USS numara doar paginile
+private, deci niciuna nu numara de doua ori greutatile unui model partajat intre workeri.
+Foloseste psutil daca este instalat, altfel /proc (Linux).
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _procese(pid: int, include_children: bool) -> List[int]:
+    if psutil is not None:
+        try:
+            proces = psutil.Process(pid)
+            return [pid] + ([c.pid for c in proces.children(recursive=True)] if include_children else [])
+        except psutil.NoSuchProcess:
+            return []
+
+    pids = [pid]
+    if include_children:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            try:
+                with open(f"/proc/{pid}/task/{task}/children") as f:
+                    for copil in f.read().split():
+                        pids.extend(_procese(int(copil), True))
+            except OSError:
+                continue
+    return pids
+
+
+def _memorie_proces(pid: int) -> Dict[str, int]:
+    """RSS, PSS si USS (octeti) pentru un singur proces; PSS/USS sunt 0 daca nu pot fi citite"""
+    if psutil is not None:
+        proces = psutil.Process(pid)
+        try:
+            info = proces.memory_full_info()
+            return {'rss': info.rss, 'pss': getattr(info, 'pss', 0), 'uss': getattr(info, 'uss', 0)}
+        except psutil.AccessDenied:
+            return {'rss': proces.memory_info().rss, 'pss': 0, 'uss': 0}
+
+    memorie = {'rss': 0, 'pss': 0, 'uss': 0}
+    with open(f"/proc/{pid}/status") as f:
+        for linie in f:
+            if linie.startswith('VmRSS:'):
+                memorie['rss'] = int(linie.split()[1]) * 1024
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for linie in f:
+                if linie.startswith('Pss:'):
+                    memorie['pss'] = int(linie.split()[1]) * 1024
+                elif linie.startswith(('Private_Clean:', 'Private_Dirty:')):
+                    memorie['uss'] += int(linie.split()[1]) * 1024
+    except OSError:
+        pass
+    return memorie
+
+
+def memory_usage(pid: Optional[int] = None, include_children: bool = True) -> Dict[str, int]:
+    """Suma RSS / PSS / USS (octeti) pentru proces si, optional, toti descendentii lui"""
+    total = {'rss': 0, 'pss': 0, 'uss': 0, 'procese': 0}
+    for p in _procese(pid or os.getpid(), include_children):
+        try:
+            memorie = _memorie_proces(p)
+        except Exception:
+            # Procesul s-a terminat intre timp
+            continue
+        total['rss'] += memorie['rss']
+        total['pss'] += memorie['pss']
+        total['uss'] += memorie['uss']
+        total['procese'] += 1
+    return total
+
+
+class MemorySampler:
+    """Esantioneaza memoria unui arbore de procese pe un thread separat"""
+
+    def __init__(self, pid: int, interval: float = 0.5, include_children: bool = True):
+        self.pid = pid
+        self.interval = interval
+        self.include_children = include_children
+        self.samples: List[Dict[str, float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(dict(memory_usage(self.pid, self.include_children), t=time.time()))
+            self._stop.wait(self.interval)
+
+    def start(self) -> "MemorySampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Dict[str, float]:
+        """Opreste esantionarea si intoarce sumarul (maxim, medie, ultima valoare)"""
+        self._stop.set()
+        self._thread.join()
+        return self.summary()
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {}
+        rss = [s['rss'] for s in self.samples]
+        pss = [s['pss'] for s in self.samples]
+        return {
+            'esantioane': len(self.samples),
+            'rss_max': max(rss), 'rss_medie': sum(rss) / len(rss), 'rss_final': rss[-1],
+            'pss_max': max(pss), 'pss_final': pss[-1],
+            'procese': self.samples[-1]['procese'],
+        }
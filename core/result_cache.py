@@ -0,0 +1,226 @@
+"""
+Cache pentru rezultatele pipeline-ului (transcriere ASR + FisaPacient)
+Cheia transcrierii este (hash-ul continutului audio, modelul ASR, parametrii de decodare);
+cheia extractiei adauga versiunea extractorului, astfel incat o schimbare a extractorului
+reruleaza doar NER, nu si ASR. Intrarile expira dupa TTL si sunt evacuate LRU peste o limita de dimensiune.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcrieri (
+    cheie TEXT PRIMARY KEY,
+    audio_hash TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    parametri TEXT NOT NULL,
+    transcriere TEXT NOT NULL,
+    dimensiune INTEGER NOT NULL,
+    creat_la REAL NOT NULL,
+    accesat_la REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS extractii (
+    cheie_transcriere TEXT NOT NULL REFERENCES transcrieri(cheie) ON DELETE CASCADE,
+    versiune_extractor TEXT NOT NULL,
+    fisa TEXT NOT NULL,
+    dimensiune INTEGER NOT NULL,
+    creat_la REAL NOT NULL,
+    accesat_la REAL NOT NULL,
+    PRIMARY KEY (cheie_transcriere, versiune_extractor)
+);
+CREATE INDEX IF NOT EXISTS idx_transcrieri_accesat_la ON transcrieri(accesat_la);
+CREATE INDEX IF NOT EXISTS idx_extractii_accesat_la ON extractii(accesat_la);
+"""
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def hash_audio(audio: Union[str, Path, bytes]) -> str:
+    """SHA-256 al continutului audio (cale catre fisier sau bytes deja citiți)"""
+    h = hashlib.sha256()
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        h.update(audio)
+    else:
+        with open(audio, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                h.update(block)
+    return h.hexdigest()
+
+
+def transcript_key(audio_hash: str, model_id: str, params: Dict[str, Any]) -> str:
+    """Cheia unei transcrieri; parametrii de decodare sunt serializați canonic"""
+    parametri = json.dumps(params or {}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{audio_hash}|{model_id}|{parametri}".encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Cache persistent (SQLite) cu TTL si evacuare LRU limitata la `max_bytes`"""
+
+    def __init__(self, db_path: str = "data/cache.db", ttl_seconds: float = 7 * 24 * 3600,
+                 max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            db_path: Calea catre fisierul SQLite (":memory:" pentru teste)
+            ttl_seconds: Durata de viata a unei intrari (None = fara expirare)
+            max_bytes: Dimensiunea maxima a continutului stocat (transcrieri + fise)
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # Serviciul FastAPI acceseaza cache-ul din mai multe fire de executie
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _expirat(self, creat_la: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - creat_la > self.ttl_seconds
+
+    def get_transcript(self, key: str) -> Optional[str]:
+        """Intoarce transcrierea din cache sau None (intrarile expirate sunt sterse)"""
+        now = time.time()
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT transcriere, creat_la FROM transcrieri WHERE cheie = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self._expirat(row[1], now):
+                self.conn.execute("DELETE FROM transcrieri WHERE cheie = ?", (key,))
+                return None
+            self.conn.execute("UPDATE transcrieri SET accesat_la = ? WHERE cheie = ?", (now, key))
+            return row[0]
+
+    def put_transcript(self, key: str, audio_hash: str, model_id: str, params: Dict[str, Any], transcript: str):
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO transcrieri "
+                "(cheie, audio_hash, model_id, parametri, transcriere, dimensiune, creat_la, accesat_la) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, audio_hash, model_id, json.dumps(params or {}, sort_keys=True, default=str),
+                 transcript, len(transcript.encode('utf-8')), now, now)
+            )
+            self._evict()
+
+    def get_fisa(self, key: str, extractor_version: str) -> Optional[Dict[str, Any]]:
+        """Intoarce fisa (ca dictionar) extrasa cu versiunea data a extractorului"""
+        now = time.time()
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT fisa, creat_la FROM extractii WHERE cheie_transcriere = ? AND versiune_extractor = ?",
+                (key, extractor_version)).fetchone()
+            if row is None:
+                return None
+            if self._expirat(row[1], now):
+                self.conn.execute(
+                    "DELETE FROM extractii WHERE cheie_transcriere = ? AND versiune_extractor = ?",
+                    (key, extractor_version))
+                return None
+            self.conn.execute(
+                "UPDATE extractii SET accesat_la = ? WHERE cheie_transcriere = ? AND versiune_extractor = ?",
+                (now, key, extractor_version))
+            # O extractie folosita tine "vie" si transcrierea de care depinde
+            self.conn.execute("UPDATE transcrieri SET accesat_la = ? WHERE cheie = ?", (now, key))
+            return json.loads(row[0])
+
+    def put_fisa(self, key: str, extractor_version: str, fisa: Dict[str, Any]):
+        """Stocheaza fisa; transcrierea corespunzatoare trebuie sa existe deja in cache"""
+        now = time.time()
+        data = json.dumps(fisa, ensure_ascii=False)
+        with self._lock, self.conn:
+            # Transcrierea poate fi deja evacuata (ex: max_bytes foarte mic)
+            if self.conn.execute("SELECT 1 FROM transcrieri WHERE cheie = ?", (key,)).fetchone() is None:
+                return
+            self.conn.execute(
+                "INSERT OR REPLACE INTO extractii "
+                "(cheie_transcriere, versiune_extractor, fisa, dimensiune, creat_la, accesat_la) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, extractor_version, data, len(data.encode('utf-8')), now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        """Sterge intrarile expirate, apoi cele mai vechi accesate pana sub `max_bytes`"""
+        if self.ttl_seconds is not None:
+            prag = time.time() - self.ttl_seconds
+            self.conn.execute("DELETE FROM extractii WHERE creat_la < ?", (prag,))
+            self.conn.execute("DELETE FROM transcrieri WHERE creat_la < ?", (prag,))
+
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+
+        # Transcrierile sunt evacuate impreuna cu extractiile lor (ON DELETE CASCADE)
+        for cheie, dimensiune in self.conn.execute(
+                "SELECT t.cheie, t.dimensiune + COALESCE(SUM(e.dimensiune), 0) "
+                "FROM transcrieri t LEFT JOIN extractii e ON e.cheie_transcriere = t.cheie "
+                "GROUP BY t.cheie ORDER BY t.accesat_la").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM transcrieri WHERE cheie = ?", (cheie,))
+            total -= dimensiune
+
+    def total_bytes(self) -> int:
+        return self.conn.execute(
+            "SELECT (SELECT COALESCE(SUM(dimensiune), 0) FROM transcrieri) + "
+            "(SELECT COALESCE(SUM(dimensiune), 0) FROM extractii)").fetchone()[0]
+
+    def transcribe_cached(self, audio: Union[str, Path, bytes], model_id: str, params: Dict[str, Any],
+                          transcribe_fn: Callable[[], str]) -> Tuple[str, str, bool]:
+        """
+        Intoarce transcrierea din cache sau o calculeaza cu `transcribe_fn` si o stocheaza
+
+        Args:
+            audio: Calea fisierului audio sau continutul sau
+            model_id: Identificatorul modelului ASR
+            params: Parametrii de decodare (num_beams, limba, ...)
+            transcribe_fn: Functie fara argumente care ruleaza ASR-ul
+
+        Returns:
+            (transcriere, cheie, hit) - cheia se foloseste apoi pentru extract_cached
+        """
+        audio_hash = hash_audio(audio)
+        key = transcript_key(audio_hash, model_id, params)
+
+        transcript = self.get_transcript(key)
+        if transcript is not None:
+            return transcript, key, True
+
+        transcript = transcribe_fn()
+        self.put_transcript(key, audio_hash, model_id, params, transcript)
+        return transcript, key, False
+
+    def extract_cached(self, key: str, extractor_version: str,
+                       extract_fn: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Intoarce fisa din cache sau o calculeaza cu `extract_fn` (care intoarce un dictionar)
+
+        Returns:
+            (fisa, hit)
+        """
+        fisa = self.get_fisa(key, extractor_version)
+        if fisa is not None:
+            return fisa, True
+
+        fisa = extract_fn()
+        self.put_fisa(key, extractor_version, fisa)
+        return fisa, False
@@ -0,0 +1,334 @@
+"""
+Depozit SQLite pentru rezultatele extrase din transcriptii medicale
+Stocheaza masuratorile, medicamentele, simptomele si diagnosticele fiecarei FisaPacient
+in tabele indexate, pentru interogari pe cohorte fara scanarea fisierelor JSON.
+"""
+
+import json
+import re
+import sqlite3
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS studii (
+    id INTEGER PRIMARY KEY,
+    sursa TEXT UNIQUE,
+    creat_la TEXT NOT NULL,
+    importat_la TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS masuratori (
+    studiu_id INTEGER NOT NULL REFERENCES studii(id) ON DELETE CASCADE,
+    structura TEXT NOT NULL,
+    valoare REAL NOT NULL,
+    unitate TEXT NOT NULL,
+    tip TEXT
+);
+CREATE TABLE IF NOT EXISTS medicamente (
+    studiu_id INTEGER NOT NULL REFERENCES studii(id) ON DELETE CASCADE,
+    nume TEXT NOT NULL,
+    dozaj TEXT,
+    frecventa TEXT
+);
+CREATE TABLE IF NOT EXISTS simptome (
+    studiu_id INTEGER NOT NULL REFERENCES studii(id) ON DELETE CASCADE,
+    simptom TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS diagnostice (
+    studiu_id INTEGER NOT NULL REFERENCES studii(id) ON DELETE CASCADE,
+    diagnostic TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_studii_creat_la ON studii(creat_la);
+CREATE INDEX IF NOT EXISTS idx_masuratori_structura_valoare ON masuratori(structura, valoare);
+CREATE INDEX IF NOT EXISTS idx_masuratori_studiu ON masuratori(studiu_id);
+CREATE INDEX IF NOT EXISTS idx_medicamente_nume ON medicamente(nume);
+CREATE INDEX IF NOT EXISTS idx_medicamente_studiu ON medicamente(studiu_id);
+CREATE INDEX IF NOT EXISTS idx_simptome_simptom ON simptome(simptom);
+CREATE INDEX IF NOT EXISTS idx_simptome_studiu ON simptome(studiu_id);
+CREATE INDEX IF NOT EXISTS idx_diagnostice_diagnostic ON diagnostice(diagnostic);
+CREATE INDEX IF NOT EXISTS idx_diagnostice_studiu ON diagnostice(studiu_id);
+"""
+
+# Numele fisierelor generate de pipeline: fisa_pacient_<YYYYmmdd_HHMMSS>.json
+TIMESTAMP_FISIER = re.compile(r'(\d{8}_\d{6})')
+# Doar fisele scrise de pipeline (fisa_pacient_<data>_<ora>.json); notebook-ul scrie in acelasi
+# director si alte JSON-uri (ex: fisa_pacient_output_generalist.json, fisa_pacient_hibrid.json)
+PATTERN_FISE = "fisa_pacient_[0-9]*_[0-9]*.json"
+CHEI_FISA = ('masuratori_ecografice', 'simptome', 'diagnostice', 'medicamente', 'observatii')
+
+
+def _to_dict(fisa_pacient: Any) -> Dict[str, Any]:
+    """Accepta atat FisaPacient cat si dictionarul incarcat din JSON"""
+    if is_dataclass(fisa_pacient):
+        return asdict(fisa_pacient)
+    return fisa_pacient
+
+
+def este_fisa_pacient(data: Any) -> bool:
+    """Dictionarul are structura unei FisaPacient (nu un alt JSON din acelasi director)"""
+    return isinstance(data, dict) and all(cheie in data for cheie in CHEI_FISA)
+
+
+def sursa_fisier(path: Union[str, Path]) -> str:
+    """Identificatorul unui fisier in depozit: calea absoluta, deci aceeasi indiferent de director"""
+    return str(Path(path).resolve())
+
+
+def _timestamp_din_fisier(path: Path) -> datetime:
+    """Deduce momentul studiului din numele fisierului sau, in lipsa, din mtime"""
+    match = TIMESTAMP_FISIER.search(path.stem)
+    if match:
+        try:
+            return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(path.stat().st_mtime)
+
+
+class ResultsStore:
+    """Depozit indexat (SQLite, mod WAL) pentru fisele pacientilor"""
+
+    def __init__(self, db_path: str = "data/results.db"):
+        """
+        Deschide (sau creeaza) baza de date
+
+        Args:
+            db_path: Calea catre fisierul SQLite (":memory:" pentru teste)
+        """
+        self.db_path = db_path
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _insert_fisa(self, data: Dict[str, Any], sursa: Optional[str], creat_la: datetime) -> Optional[int]:
+        """Insereaza o fisa in tranzactia curenta; intoarce None daca sursa exista deja"""
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO studii (sursa, creat_la, importat_la) VALUES (?, ?, ?)",
+            (sursa, creat_la.isoformat(timespec='seconds'), datetime.now().isoformat(timespec='seconds'))
+        )
+        if cursor.rowcount == 0:
+            return None
+        studiu_id = cursor.lastrowid
+
+        self.conn.executemany(
+            "INSERT INTO masuratori (studiu_id, structura, valoare, unitate, tip) VALUES (?, ?, ?, ?, ?)",
+            [(studiu_id, m['structura_anatomica'], m['valoare_numerica'], m.get('unitate_masura', 'mm'), m.get('tip_masurare'))
+             for m in data.get('masuratori_ecografice', [])]
+        )
+        self.conn.executemany(
+            "INSERT INTO medicamente (studiu_id, nume, dozaj, frecventa) VALUES (?, ?, ?, ?)",
+            [(studiu_id, med['nume'], med.get('dozaj'), med.get('frecventa'))
+             for med in data.get('medicamente', [])]
+        )
+        self.conn.executemany(
+            "INSERT INTO simptome (studiu_id, simptom) VALUES (?, ?)",
+            [(studiu_id, simptom) for simptom in data.get('simptome', [])]
+        )
+        self.conn.executemany(
+            "INSERT INTO diagnostice (studiu_id, diagnostic) VALUES (?, ?)",
+            [(studiu_id, diagnostic) for diagnostic in data.get('diagnostice', [])]
+        )
+        return studiu_id
+
+    def add_fisa(self, fisa_pacient: Any, sursa: str = None, creat_la: datetime = None) -> Optional[int]:
+        """
+        Adauga o singura fisa a pacientului
+
+        Args:
+            fisa_pacient: FisaPacient sau dictionarul echivalent (din JSON)
+            sursa: Identificatorul unic al studiului (ex: calea JSON-ului)
+            creat_la: Momentul studiului (implicit: acum)
+
+        Returns:
+            Id-ul studiului sau None daca sursa era deja importata
+        """
+        with self.conn:
+            return self._insert_fisa(_to_dict(fisa_pacient), sursa, creat_la or datetime.now())
+
+    def add_fise(self, fise: Iterable[Tuple[Any, Optional[str], Optional[datetime]]], batch_size: int = 500) -> int:
+        """
+        Adauga mai multe fise in tranzactii de cate `batch_size` studii
+
+        Args:
+            fise: Tupluri (fisa_pacient, sursa, creat_la)
+            batch_size: Numarul de studii per tranzactie
+
+        Returns:
+            Numarul de studii noi inserate
+        """
+        inserate = 0
+        batch = []
+
+        def flush():
+            nonlocal inserate
+            with self.conn:
+                for data, sursa, creat_la in batch:
+                    if self._insert_fisa(data, sursa, creat_la or datetime.now()) is not None:
+                        inserate += 1
+            batch.clear()
+
+        for fisa_pacient, sursa, creat_la in fise:
+            batch.append((_to_dict(fisa_pacient), sursa, creat_la))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        return inserate
+
+    def backfill_from_json(self, directory: str = "data", pattern: str = PATTERN_FISE,
+                           batch_size: int = 500) -> int:
+        """
+        Importa fisierele JSON existente (idempotent: sursele deja importate sunt ignorate)
+
+        Returns:
+            Numarul de studii noi inserate
+        """
+        def citeste():
+            for path in sorted(Path(directory).glob(pattern)):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"Fisier ignorat ({path}): {e}")
+                    continue
+                if not este_fisa_pacient(data):
+                    print(f"Fisier ignorat ({path}): nu este o FisaPacient")
+                    continue
+                yield data, sursa_fisier(path), _timestamp_din_fisier(path)
+
+        return self.add_fise(citeste(), batch_size=batch_size)
+
+    def query_masuratori(self, structura: str = None, min_valoare: float = None, max_valoare: float = None,
+                         de_la: datetime = None, pana_la: datetime = None, unitate: str = None,
+                         peste: float = None, sub: float = None) -> List[Dict[str, Any]]:
+        """
+        Cauta masuratori dupa structura anatomica, interval de valori si perioada
+
+        min_valoare / max_valoare sunt limite inclusive (>=, <=), peste / sub sunt stricte (>, <).
+
+        Exemplu: toate studiile cu aorta la sinusuri > 35 mm in trimestrul curent
+            store.query_masuratori("aorta la sinusuri", peste=35, de_la=inceput_trimestru())
+        """
+        conditii, parametri = [], []
+        if structura is not None:
+            conditii.append("m.structura = ?")
+            parametri.append(structura.lower().strip())
+        if min_valoare is not None:
+            conditii.append("m.valoare >= ?")
+            parametri.append(min_valoare)
+        if max_valoare is not None:
+            conditii.append("m.valoare <= ?")
+            parametri.append(max_valoare)
+        if peste is not None:
+            conditii.append("m.valoare > ?")
+            parametri.append(peste)
+        if sub is not None:
+            conditii.append("m.valoare < ?")
+            parametri.append(sub)
+        if unitate is not None:
+            conditii.append("m.unitate = ?")
+            parametri.append(unitate)
+        conditii_studiu, parametri_studiu = self._conditii_perioada(de_la, pana_la)
+
+        sql = (
+            "SELECT s.id AS studiu_id, s.sursa, s.creat_la, m.structura, m.valoare, m.unitate, m.tip "
+            "FROM masuratori m JOIN studii s ON s.id = m.studiu_id"
+        )
+        where = conditii + conditii_studiu
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY s.creat_la, s.id"
+
+        return [dict(row) for row in self.conn.execute(sql, parametri + parametri_studiu)]
+
+    def query_studii(self, medicament: str = None, simptom: str = None, diagnostic: str = None,
+                     de_la: datetime = None, pana_la: datetime = None) -> List[Dict[str, Any]]:
+        """Cauta studiile care contin un anumit medicament, simptom si/sau diagnostic"""
+        conditii, parametri = self._conditii_perioada(de_la, pana_la)
+        if medicament is not None:
+            conditii.append("s.id IN (SELECT studiu_id FROM medicamente WHERE nume = ?)")
+            parametri.append(medicament.capitalize())
+        if simptom is not None:
+            conditii.append("s.id IN (SELECT studiu_id FROM simptome WHERE simptom = ?)")
+            parametri.append(simptom.capitalize())
+        if diagnostic is not None:
+            conditii.append("s.id IN (SELECT studiu_id FROM diagnostice WHERE diagnostic LIKE ?)")
+            parametri.append(f"%{diagnostic}%")
+
+        sql = "SELECT s.id AS studiu_id, s.sursa, s.creat_la FROM studii s"
+        if conditii:
+            sql += " WHERE " + " AND ".join(conditii)
+        sql += " ORDER BY s.creat_la, s.id"
+
+        return [dict(row) for row in self.conn.execute(sql, parametri)]
+
+    def get_fisa(self, studiu_id: int) -> Optional[Dict[str, Any]]:
+        """Reconstruieste dictionarul fisei (formatul JSON) pentru un studiu"""
+        studiu = self.conn.execute("SELECT id FROM studii WHERE id = ?", (studiu_id,)).fetchone()
+        if studiu is None:
+            return None
+
+        return {
+            'masuratori_ecografice': [
+                {'structura_anatomica': r['structura'], 'valoare_numerica': r['valoare'],
+                 'unitate_masura': r['unitate'], 'tip_masurare': r['tip']}
+                for r in self.conn.execute(
+                    "SELECT structura, valoare, unitate, tip FROM masuratori WHERE studiu_id = ? ORDER BY rowid",
+                    (studiu_id,))
+            ],
+            'simptome': [r[0] for r in self.conn.execute(
+                "SELECT simptom FROM simptome WHERE studiu_id = ? ORDER BY rowid", (studiu_id,))],
+            'diagnostice': [r[0] for r in self.conn.execute(
+                "SELECT diagnostic FROM diagnostice WHERE studiu_id = ? ORDER BY rowid", (studiu_id,))],
+            'medicamente': [
+                {'nume': r['nume'], 'dozaj': r['dozaj'], 'frecventa': r['frecventa']}
+                for r in self.conn.execute(
+                    "SELECT nume, dozaj, frecventa FROM medicamente WHERE studiu_id = ? ORDER BY rowid",
+                    (studiu_id,))
+            ],
+        }
+
+    def stats(self) -> Dict[str, Union[int, List[Dict[str, Any]]]]:
+        """Sumar al depozitului: numar de studii si statistici pe structuri anatomice"""
+        nr_studii = self.conn.execute("SELECT COUNT(*) FROM studii").fetchone()[0]
+        structuri = [
+            dict(row) for row in self.conn.execute(
+                "SELECT structura, COUNT(*) AS numar, AVG(valoare) AS medie, MIN(valoare) AS minim, "
+                "MAX(valoare) AS maxim FROM masuratori GROUP BY structura ORDER BY structura")
+        ]
+        return {'studii': nr_studii, 'structuri': structuri}
+
+    @staticmethod
+    def _conditii_perioada(de_la: Optional[datetime], pana_la: Optional[datetime]) -> Tuple[List[str], List[Any]]:
+        conditii, parametri = [], []
+        if de_la is not None:
+            conditii.append("s.creat_la >= ?")
+            parametri.append(de_la.isoformat(timespec='seconds'))
+        if pana_la is not None:
+            conditii.append("s.creat_la < ?")
+            parametri.append(pana_la.isoformat(timespec='seconds'))
+        return conditii, parametri
+
+
+def inceput_trimestru(moment: datetime = None) -> datetime:
+    """Prima zi a trimestrului care contine `moment` (implicit: acum)"""
+    moment = moment or datetime.now()
+    return datetime(moment.year, 3 * ((moment.month - 1) // 3) + 1, 1)
@@ -0,0 +1,242 @@
+"""
+Transcriere Whisper pe segmente de 30 de secunde
+Segmentele vin direct din fluxul audio (core.audio_stream), deci inregistrarile lungi
+nu sunt niciodata incarcate integral in memorie.
+"""
+
+import logging
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import torch
+from transformers import LogitsProcessor, LogitsProcessorList
+
+from core.audio_stream import TARGET_SAMPLE_RATE, stream_chunks
+from core.log_mel import LogMelFrontend
+
+# Escaladarile beam-ului adaptiv sunt raportate aici indiferent de verbose (ex: in server)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AdaptiveBeamPolicy:
+    """
+    Beam adaptiv: fiecare segment este decodat intai greedy; doar segmentele cu incredere
+    mica sunt decodate din nou cu beam search (latimea num_beams a transcriberului)
+
+    Args:
+        logprob_threshold: Se escaladeaza sub aceasta medie a log-probabilitatii per token
+        compression_ratio_threshold: Se escaladeaza peste acest raport de compresie (text repetitiv)
+    """
+    logprob_threshold: float = -0.6
+    compression_ratio_threshold: float = 2.4
+
+    def motiv_escaladare(self, avg_logprob: float, compression_ratio: float) -> Optional[str]:
+        """Motivul pentru care segmentul trebuie decodat din nou, sau None"""
+        if compression_ratio > self.compression_ratio_threshold:
+            return f"compresie {compression_ratio:.2f} > {self.compression_ratio_threshold}"
+        if avg_logprob < self.logprob_threshold:
+            return f"logprob {avg_logprob:.2f} < {self.logprob_threshold}"
+        return None
+
+
+def compression_ratio(text: str) -> float:
+    """Raportul de compresie zlib al textului (ca in Whisper): valori mari = repetitii/halucinatii"""
+    text_bytes = text.encode("utf-8")
+    return len(text_bytes) / len(zlib.compress(text_bytes)) if text_bytes else 0.0
+
+
+class _GreedyConfidence(LogitsProcessor):
+    """
+    Retine, la fiecare pas greedy, tokenul ales si log-probabilitatea lui
+    Este ultimul procesor din lista, deci vede scorurile finale (dupa suprimari); evita
+    output_scores / return_dict_in_generate, care copiaza cache-ul decodorului per segment.
+    """
+
+    def __init__(self):
+        self.tokens = []
+        self.logprobs = []
+
+    def __call__(self, input_ids, scores):
+        logprobs, tokens = torch.log_softmax(scores.float(), dim=-1).max(dim=-1)
+        self.tokens.append(tokens)
+        self.logprobs.append(logprobs)
+        return scores
+
+    def avg_logprobs(self, eos_token_id: int) -> List[float]:
+        """Media pe tokenii generati, pana la primul EOS inclusiv, per segment"""
+        tokens = torch.stack(self.tokens, dim=1)
+        logprobs = torch.stack(self.logprobs, dim=1)
+        is_eos = tokens == eos_token_id
+        # Pasii de dupa primul EOS apartin segmentelor deja terminate
+        valid = (is_eos.cumsum(dim=1) - is_eos.long()) == 0
+        return ((logprobs * valid).sum(dim=1) / valid.sum(dim=1).clamp(min=1)).tolist()
+
+
+class WhisperTranscriber:
+    """Ruleaza modelul Whisper segment cu segment si concateneaza textul"""
+
+    def __init__(self, model, processor, device=None, num_beams: int = 5, max_length: int = 448,
+                 temperature: float = 0.0, language: str = "romanian", task: str = "transcribe",
+                 chunk_sec: float = 30, batch_size: int = 1, adaptive: Optional[AdaptiveBeamPolicy] = None):
+        """
+        Args:
+            model: WhisperForConditionalGeneration deja incarcat
+            processor: WhisperProcessor corespunzator
+            device: Dispozitivul modelului (implicit: cel al parametrilor modelului)
+            num_beams: Latimea beam search-ului (cu adaptive: doar pentru segmentele escaladate)
+            max_length: Lungimea maxima a secventei generate (maximul suportat de Whisper)
+            temperature: 0.0 pentru decodare determinista
+            language, task: Prompt-ul fortat al decodorului
+            chunk_sec: Durata unui segment audio
+            batch_size: Numarul de segmente procesate impreuna (caracteristici + generate)
+            adaptive: Politica de beam adaptiv (None = num_beams pentru toate segmentele)
+        """
+        self.model = model
+        self.processor = processor
+        self.device = device if device is not None else next(model.parameters()).device
+        self.num_beams = num_beams
+        self.max_length = max_length
+        self.temperature = temperature
+        self.language = language
+        self.task = task
+        self.chunk_sec = chunk_sec
+        self.batch_size = batch_size
+        self.adaptive = adaptive
+        # Contoare cumulate pentru beam-ul adaptiv
+        self.segmente_decodate = 0
+        self.segmente_escaladate = 0
+
+        # Caracteristicile log-mel pentru tot lotul intr-o singura trecere (in locul processor(...))
+        self.frontend = LogMelFrontend.from_processor(processor, self.device, max_batch=batch_size)
+
+        # forțare decodor română
+        try:
+            self.forced_decoder_ids = processor.get_decoder_prompt_ids(language=language, task=task)
+        except Exception:
+            self.forced_decoder_ids = None
+
+    @property
+    def decoding_params(self) -> Dict[str, Any]:
+        """Parametrii care influenteaza transcrierea (folositi in cheia cache-ului)"""
+        params = {
+            "chunk_sec": self.chunk_sec, "max_length": self.max_length, "num_beams": self.num_beams,
+            "temperature": self.temperature, "language": self.language, "task": self.task,
+        }
+        if self.adaptive is not None:
+            params["adaptive"] = asdict(self.adaptive)
+        return params
+
+    def generate_kwargs(self, num_beams: int = None) -> Dict[str, Any]:
+        tokenizer = self.processor.tokenizer
+        return dict(
+            max_length=self.max_length,
+            num_beams=num_beams or self.num_beams,
+            temperature=self.temperature,
+            forced_decoder_ids=self.forced_decoder_ids,
+            pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
+            eos_token_id=tokenizer.eos_token_id,
+        )
+
+    def _decode(self, gen) -> List[str]:
+        return [text.strip() for text in self.processor.batch_decode(gen, skip_special_tokens=True)]
+
+    def decode_batch(self, chunk_waves: Sequence[np.ndarray]) -> List[Dict[str, Any]]:
+        """
+        Transcrie mai multe segmente (mono, 16 kHz, maxim 30 de secunde)
+
+        Returns:
+            Per segment: text; cu beam adaptiv si avg_logprob, compression_ratio si motivul
+            escaladarii (None daca a ramas decodarea greedy)
+        """
+        features = self.frontend(chunk_waves)
+
+        if self.adaptive is None:
+            with torch.no_grad():
+                gen = self.model.generate(features, **self.generate_kwargs())
+            return [{"text": text} for text in self._decode(gen)]
+
+        incredere = _GreedyConfidence()
+        with torch.no_grad():
+            gen = self.model.generate(features, logits_processor=LogitsProcessorList([incredere]),
+                                      **self.generate_kwargs(num_beams=1))
+        rezultate = []
+        logprobs = incredere.avg_logprobs(self.processor.tokenizer.eos_token_id)
+        for text, logprob in zip(self._decode(gen), logprobs):
+            ratio = compression_ratio(text)
+            # Cu num_beams=1 nu exista o decodare mai larga la care sa se escaladeze
+            motiv = self.adaptive.motiv_escaladare(logprob, ratio) if self.num_beams > 1 else None
+            rezultate.append({"text": text, "avg_logprob": logprob, "compression_ratio": ratio, "escaladat": motiv})
+
+        # Doar segmentele nesigure platesc beam search-ul, intr-un singur generate
+        escaladate = [i for i, r in enumerate(rezultate) if r["escaladat"]]
+        if escaladate:
+            with torch.no_grad():
+                gen = self.model.generate(features[escaladate], **self.generate_kwargs())
+            for i, text in zip(escaladate, self._decode(gen)):
+                rezultate[i]["text"] = text
+
+        self.segmente_decodate += len(rezultate)
+        self.segmente_escaladate += len(escaladate)
+        return rezultate
+
+    def transcribe_batch(self, chunk_waves: Sequence[np.ndarray]) -> List[str]:
+        """Transcrie mai multe segmente (mono, 16 kHz, maxim 30 de secunde) intr-un singur generate"""
+        return [r["text"] for r in self.decode_batch(chunk_waves)]
+
+    def transcribe_chunk(self, chunk_wave: np.ndarray) -> str:
+        """Transcrie un singur segment (mono, 16 kHz, maxim 30 de secunde)"""
+        return self.transcribe_batch([chunk_wave])[0]
+
+    def transcribe_chunks(self, chunks: Iterable[np.ndarray], verbose: bool = True) -> str:
+        segments = []
+        total = 0
+        numar_segmente = 0
+        lot = []
+        escaladate = []
+
+        def proceseaza(lot, start):
+            for idx, rezultat in enumerate(self.decode_batch(lot), start):
+                if rezultat.get("escaladat"):
+                    escaladate.append(idx)
+                    logger.info("Chunk %d escaladat la beam %d: %s", idx, self.num_beams, rezultat["escaladat"])
+                    if verbose:
+                        print(f"   ↑ Chunk {idx} escaladat la beam {self.num_beams}: {rezultat['escaladat']}")
+                decoded = rezultat["text"]
+                if decoded:
+                    segments.append(decoded)
+                    if verbose:
+                        print(f"   → Transcris: {decoded[:100]}..." if len(decoded) > 100 else f"   → Transcris: {decoded}")
+
+        for idx, chunk_wave in enumerate(chunks):
+            if verbose:
+                print(f"Chunk {idx}: {len(chunk_wave) / TARGET_SAMPLE_RATE:.1f}s "
+                      f"(samples {total} → {total + len(chunk_wave)})")
+            total += len(chunk_wave)
+            numar_segmente += 1
+
+            lot.append(chunk_wave)
+            if len(lot) == self.batch_size:
+                proceseaza(lot, idx + 1 - len(lot))
+                lot = []
+        if lot:
+            proceseaza(lot, idx + 1 - len(lot))
+
+        # Concatenare segmente (fără overlap pentru a evita duplicarea)
+        full_text = " ".join(segments)
+        if self.adaptive is not None:
+            logger.info("Beam adaptiv: %d/%d segmente escaladate la beam %d",
+                        len(escaladate), numar_segmente, self.num_beams)
+        if verbose:
+            print(f"\n✓ Transcripție completă: {len(full_text)} caractere, {len(segments)} segmente "
+                  f"({total / TARGET_SAMPLE_RATE:.1f}s audio)")
+            if self.adaptive is not None:
+                print(f"  Beam adaptiv: {len(escaladate)} segmente escaladate la beam {self.num_beams}"
+                      + (f" ({', '.join(map(str, escaladate))})" if escaladate else ""))
+        return full_text
+
+    def transcribe(self, audio_path: str, verbose: bool = True) -> str:
+        """Transcrie un fisier audio de orice durata, cu memorie constanta"""
+        return self.transcribe_chunks(stream_chunks(audio_path, self.chunk_sec), verbose=verbose)
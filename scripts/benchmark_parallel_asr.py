@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark de scalare pentru ParallelTranscriber (CPU)
+
+Transcrie aceleasi segmente cu 1, 2, 4, ... procese worker si raporteaza throughput-ul
+si memoria (RSS, PSS, USS) pentru fiecare numar de workeri. RSS numara greutatile partajate
+in fiecare proces; PSS si USS arata memoria reala.
+
+Exemple:
+    python scripts/benchmark_parallel_asr.py --workers 1 2 4 8 16 32 --chunks 64
+    python scripts/benchmark_parallel_asr.py --num-beams 1 --threads-per-worker 2
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+# Adaugă calea către directorul părinte pentru a accesa core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.audio_stream import TARGET_SAMPLE_RATE, stream_chunks
+from core.process_memory import MemorySampler, memory_usage
+
+MODEL_ID = "alexvladu1/whisper_finetuned_ro"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Scalarea transcrierii multi-proces pe CPU")
+    parser.add_argument("--model", default=MODEL_ID)
+    parser.add_argument("--files", nargs="+", default=["dataset/train_wav/*.wav"])
+    parser.add_argument("--chunks", type=int, default=32, help="Numarul de segmente de 30 s transcrise")
+    parser.add_argument("--workers", type=int, nargs="+", help="Numerele de workeri testate (implicit 1, 2, 4, ... nuclee)")
+    parser.add_argument("--threads-per-worker", type=int, help="Implicit: nuclee / workeri")
+    parser.add_argument("--start-method", choices=["fork", "spawn"])
+    parser.add_argument("--num-beams", type=int, default=1)
+    parser.add_argument("--max-length", type=int, default=448)
+    parser.add_argument("--output", help="Rezultatele in format JSON")
+    return parser
+
+
+def incarca_segmente(patterns, numar):
+    segmente = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            for chunk in stream_chunks(path):
+                segmente.append(chunk)
+                if len(segmente) == numar:
+                    return segmente
+    return segmente
+
+
+def benchmark(model, processor, segmente, worker_counts, threads_per_worker=None, start_method=None,
+              **transcriber_kwargs):
+    """Ruleaza ParallelTranscriber pentru fiecare numar de workeri; intoarce o linie per configuratie"""
+    from core.parallel_asr import ParallelTranscriber
+
+    durata_audio = sum(len(s) for s in segmente) / TARGET_SAMPLE_RATE
+    referinta = None
+    rezultate = []
+
+    for n in worker_counts:
+        with ParallelTranscriber(model, processor, num_workers=n, threads_per_worker=threads_per_worker,
+                                 start_method=start_method, **transcriber_kwargs) as executor:
+            # Incalzire: fiecare worker proceseaza un segment (initializari lazy, alocari)
+            executor.transcribe_chunks(segmente[:n])
+
+            sampler = MemorySampler(os.getpid(), interval=0.25).start()
+            start = time.perf_counter()
+            texte = executor.transcribe_chunks(segmente)
+            secunde = time.perf_counter() - start
+            memorie = sampler.stop()
+            final = memory_usage()
+
+            if referinta is None:
+                referinta = texte
+            rezultate.append({
+                "workeri": n,
+                "threaduri_per_worker": executor.threads_per_worker,
+                "secunde": secunde,
+                "segmente_pe_secunda": len(segmente) / secunde,
+                "audio_pe_secunda": durata_audio / secunde,
+                "rss_max_mb": memorie["rss_max"] / 2**20,
+                "pss_max_mb": memorie["pss_max"] / 2**20,
+                "uss_mb": final["uss"] / 2**20,
+                "identic_cu_primul": texte == referinta,
+            })
+    return rezultate
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from transformers import WhisperProcessor, WhisperForConditionalGeneration
+
+    segmente = incarca_segmente(args.files, args.chunks)
+    if not segmente:
+        print(f"Niciun fisier audio gasit pentru: {' '.join(args.files)}")
+        sys.exit(1)
+
+    cpu = os.cpu_count() or 1
+    worker_counts = args.workers or [n for n in (1, 2, 4, 8, 16, 32, 64) if n <= cpu]
+
+    print(f"Se incarca modelul {args.model}...")
+    processor = WhisperProcessor.from_pretrained(args.model)
+    model = WhisperForConditionalGeneration.from_pretrained(args.model)
+    model.eval()
+    greutati = sum(p.numel() * p.element_size() for p in model.parameters()) / 2**20
+    print(f"Greutati: {greutati:.0f} MB; {len(segmente)} segmente, {cpu} nuclee, workeri: {worker_counts}")
+
+    rezultate = benchmark(model, processor, segmente, worker_counts, args.threads_per_worker, args.start_method,
+                          num_beams=args.num_beams, max_length=args.max_length)
+
+    print("\n" + "=" * 100)
+    print(f"{'workeri':>8} {'thr/w':>6} {'timp (s)':>9} {'seg/s':>7} {'audio x':>8} "
+          f"{'RSS max':>9} {'PSS max':>9} {'USS':>9} {'identic':>8}")
+    print("-" * 100)
+    for r in rezultate:
+        print(f"{r['workeri']:>8} {r['threaduri_per_worker']:>6} {r['secunde']:>9.1f} "
+              f"{r['segmente_pe_secunda']:>7.2f} {r['audio_pe_secunda']:>8.1f} "
+              f"{r['rss_max_mb']:>7.0f}MB {r['pss_max_mb']:>7.0f}MB {r['uss_mb']:>7.0f}MB "
+              f"{'da' if r['identic_cu_primul'] else 'NU':>8}")
+    print("=" * 100)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "greutati_mb": greutati, "segmente": len(segmente),
+                       "rezultate": rezultate}, f, indent=2, ensure_ascii=False)
+        print(f"Rezultate salvate in: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Evalueaza beam-ul adaptiv (AdaptiveBeamPolicy) pe dataset/train_wav (fisiere .wav cu referinta .txt)
+
+Fiecare segment este decodat o data greedy (cu increderea lui) si o data cu beam search.
+Decodarea adaptiva alege exact una dintre cele doua variante per segment, deci WER-ul si
+timpul fiecarei politici (praguri) se calculeaza fara alte decodari. Se compara cu beam
+search pe toate segmentele: politica trece daca WER-ul creste cu cel mult --tolerance.
+
+Exemple:
+    python scripts/evaluate_adaptive_beam.py
+    python scripts/evaluate_adaptive_beam.py --logprob-threshold -0.4 -0.6 -0.8 --tolerance 0.005
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+# Adaugă calea către directorul părinte pentru a accesa core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.audio_stream import stream_chunks
+from core.whisper_transcriber import AdaptiveBeamPolicy
+
+MODEL_ID = "alexvladu1/whisper_finetuned_ro"
+
+
+def build_parser():
+    implicit = AdaptiveBeamPolicy()
+    parser = argparse.ArgumentParser(description="WER si timp: beam adaptiv vs beam fix")
+    parser.add_argument("--model", default=MODEL_ID)
+    parser.add_argument("--files", nargs="+", default=["dataset/train_wav/*.wav"])
+    parser.add_argument("--limit", type=int, help="Doar primele N fisiere")
+    parser.add_argument("--num-beams", type=int, default=5)
+    parser.add_argument("--logprob-threshold", type=float, nargs="+", default=[implicit.logprob_threshold],
+                        help="Unul sau mai multe praguri; primul este politica verificata")
+    parser.add_argument("--compression-ratio-threshold", type=float, default=implicit.compression_ratio_threshold)
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Cresterea maxima admisa a WER (absolut)")
+    parser.add_argument("--output", help="Rezultatele in format JSON")
+    return parser
+
+
+def cuvinte(text):
+    """Normalizare pentru WER: litere mici, fara punctuatie"""
+    return re.findall(r"\w+", text.lower())
+
+
+def erori_cuvinte(referinta, ipoteza):
+    """Distanta Levenshtein la nivel de cuvant (substitutii + stergeri + inserari)"""
+    anterior = list(range(len(ipoteza) + 1))
+    for i, ref in enumerate(referinta, 1):
+        curent = [i] + [0] * len(ipoteza)
+        for j, hyp in enumerate(ipoteza, 1):
+            curent[j] = min(anterior[j] + 1, curent[j - 1] + 1, anterior[j - 1] + (ref != hyp))
+        anterior = curent
+    return anterior[-1]
+
+
+def perechi(patterns, limit=None):
+    rezultat = []
+    for pattern in patterns:
+        for wav in sorted(glob.glob(pattern)):
+            txt = os.path.splitext(wav)[0] + ".txt"
+            if os.path.exists(txt):
+                rezultat.append((wav, txt))
+    return rezultat[:limit] if limit else rezultat
+
+
+def decodeaza(perechi_fisiere, greedy, beam):
+    """Per fisier: referinta si, per segment, rezultatul greedy (cu incredere), textul beam si timpii"""
+    fisiere = []
+    for n, (wav, txt) in enumerate(perechi_fisiere, 1):
+        with open(txt, encoding="utf-8") as f:
+            referinta = f.read()
+        segmente = []
+        for chunk_wave in stream_chunks(wav, greedy.chunk_sec):
+            start = time.perf_counter()
+            rezultat = greedy.decode_batch([chunk_wave])[0]
+            timp_greedy = time.perf_counter() - start
+            start = time.perf_counter()
+            text_beam = beam.transcribe_chunk(chunk_wave)
+            segmente.append(dict(rezultat, beam=text_beam, timp_greedy=timp_greedy,
+                                 timp_beam=time.perf_counter() - start))
+        fisiere.append({"fisier": os.path.basename(wav), "referinta": referinta, "segmente": segmente})
+        print(f"[{n}/{len(perechi_fisiere)}] {os.path.basename(wav)}: {len(segmente)} segmente")
+    return fisiere
+
+
+def evalueaza(fisiere, alege, doar_beam=False):
+    """
+    WER total, timp si segmentele escaladate pentru o regula de alegere (segment -> bool)
+    Segmentele escaladate platesc ambele decodari; doar_beam = beam fix, fara decodarea greedy.
+    """
+    erori = total = 0
+    timp = 0.0
+    escaladate = []
+    for fisier in fisiere:
+        texte = []
+        for idx, segment in enumerate(fisier["segmente"]):
+            if doar_beam:
+                texte.append(segment["beam"])
+                timp += segment["timp_beam"]
+            elif alege(segment):
+                texte.append(segment["beam"])
+                timp += segment["timp_greedy"] + segment["timp_beam"]
+                escaladate.append(f"{fisier['fisier']}:{idx}")
+            else:
+                texte.append(segment["text"])
+                timp += segment["timp_greedy"]
+        referinta = cuvinte(fisier["referinta"])
+        erori += erori_cuvinte(referinta, cuvinte(" ".join(t for t in texte if t)))
+        total += len(referinta)
+    return {"wer": erori / max(total, 1), "secunde": timp, "escaladate": escaladate}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    import torch
+    from transformers import WhisperProcessor, WhisperForConditionalGeneration
+    from core.whisper_transcriber import WhisperTranscriber
+
+    perechi_fisiere = perechi(args.files, args.limit)
+    if not perechi_fisiere:
+        print(f"Nicio pereche .wav/.txt gasita pentru: {' '.join(args.files)}")
+        sys.exit(1)
+
+    print(f"Se incarca modelul {args.model}...")
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    processor = WhisperProcessor.from_pretrained(args.model)
+    model = WhisperForConditionalGeneration.from_pretrained(args.model).to(device)
+    model.eval()
+
+    # Cu num_beams=1 nu se escaladeaza: doar decodarea greedy si increderea ei
+    greedy = WhisperTranscriber(model, processor, device, num_beams=1, adaptive=AdaptiveBeamPolicy())
+    beam = WhisperTranscriber(model, processor, device, num_beams=args.num_beams)
+    fisiere = decodeaza(perechi_fisiere, greedy, beam)
+
+    nume_beam = f"beam {args.num_beams}"
+    rezultate = {"greedy": evalueaza(fisiere, lambda s: False),
+                 nume_beam: evalueaza(fisiere, None, doar_beam=True)}
+    politici = {}
+    for prag in args.logprob_threshold:
+        politica = AdaptiveBeamPolicy(prag, args.compression_ratio_threshold)
+        nume = f"adaptiv {politica.logprob_threshold:g}/{politica.compression_ratio_threshold:g}"
+        politici[nume] = politica
+        rezultate[nume] = evalueaza(
+            fisiere, lambda s, p=politica: p.motiv_escaladare(s["avg_logprob"], s["compression_ratio"]) is not None)
+    referinta = rezultate[nume_beam]
+    numar_segmente = sum(len(f["segmente"]) for f in fisiere)
+
+    print("\n" + "=" * 80)
+    print(f"{'configuratie':<22} {'WER':>8} {'Δ WER':>8} {'timp (s)':>9} {'x beam':>7} {'escaladate':>11}")
+    print("-" * 80)
+    for nume, r in rezultate.items():
+        escaladate = f"{len(r['escaladate'])}/{numar_segmente}" if nume in politici else ""
+        print(f"{nume:<22} {r['wer']:>8.2%} {r['wer'] - referinta['wer']:>+8.2%} {r['secunde']:>9.1f} "
+              f"{r['secunde'] / max(referinta['secunde'], 1e-9):>7.2f} {escaladate:>11}")
+    print("=" * 80)
+
+    # Prima politica este cea verificata fata de toleranta
+    nume = next(iter(politici))
+    verificata = rezultate[nume]
+    print(f"\nSegmente escaladate ({nume}): {', '.join(verificata['escaladate']) or '-'}")
+    delta = verificata["wer"] - referinta["wer"]
+    trece = delta <= args.tolerance
+    print(f"{'✓' if trece else '✗'} Δ WER {delta:+.2%} (toleranta {args.tolerance:.2%})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "num_beams": args.num_beams, "tolerance": args.tolerance,
+                       "segmente": numar_segmente, "rezultate": rezultate}, f, indent=2, ensure_ascii=False)
+        print(f"Rezultate salvate in: {args.output}")
+
+    sys.exit(0 if trece else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Test de incarcare pentru serviciul de transcriere
+
+Retrimite fisierele din dataset/ catre POST /upload-audio/ cu concurenta si rata de sosire
+configurabile, masoara latenta fiecarei cereri, throughput-ul, erorile si memoria serverului.
+Argumentele de dupa `--` sunt transmise lui scripts/serve.py (serverul pornit local).
+
+Exemple:
+    python scripts/load_test.py --requests 40 --concurrency 4 -- --stub
+    python scripts/load_test.py --rate 0.5 --duration 120 -- --num-beams 1 --batch-size 4
+    python scripts/load_test.py --url http://127.0.0.1:8000 --concurrency 8
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+# Adaugă calea către directorul părinte pentru a accesa core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.process_memory import MemorySampler
+
+FISIERE_IMPLICITE = ["dataset/train_wav/*.wav", "dataset/train/*"]
+EXTENSII_AUDIO = {".wav", ".ogg", ".mp3", ".flac", ".m4a", ".mpeg"}
+# Limitele (secunde) ale histogramei de latenta
+LIMITE_HISTOGRAMA = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Test de incarcare pentru /upload-audio/")
+    parser.add_argument("--url", help="Server deja pornit (altfel se porneste scripts/serve.py local)")
+    parser.add_argument("--files", nargs="+", default=FISIERE_IMPLICITE, help="Pattern-uri glob cu fisiere audio")
+    parser.add_argument("--no-decode-check", action="store_true",
+                        help="Trimite si fisierele pe care libsndfile nu le poate decoda (ex: server cu alt decodor)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Cereri simultane maxime")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Cereri pe secunda (sosiri Poisson); 0 = bucla inchisa, cat de repede se poate")
+    parser.add_argument("--requests", type=int, default=50, help="Numarul total de cereri")
+    parser.add_argument("--duration", type=float, help="Durata maxima a testului (secunde)")
+    parser.add_argument("--warmup", type=int, default=1, help="Cereri initiale excluse din statistici")
+    parser.add_argument("--timeout", type=float, default=600, help="Timeout per cerere (secunde)")
+    parser.add_argument("--startup-timeout", type=float, default=600, help="Asteptarea pornirii serverului")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Raportul JSON (implicit data/load_tests/load_test_<timestamp>.json)")
+    parser.add_argument("server_args", nargs=argparse.REMAINDER, help="Dupa --: argumente pentru scripts/serve.py")
+    return parser
+
+
+def gaseste_fisiere(patterns, verifica_decodare=True):
+    """
+    Fisierele audio care se potrivesc pattern-urilor si cele ignorate
+
+    Cu verifica_decodare, fisierele pe care serverul (soundfile / libsndfile) nu le poate citi,
+    ex. .m4a fara ffmpeg, sunt excluse: altfel erorile lor s-ar amesteca cu erorile reale ale
+    serverului si ar denatura latenta si throughput-ul.
+    """
+    import soundfile as sf
+
+    fisiere, ignorate = [], []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            if os.path.splitext(path)[1].lower() not in EXTENSII_AUDIO:
+                continue
+            if verifica_decodare:
+                try:
+                    sf.info(path)
+                except Exception:
+                    ignorate.append(path)
+                    continue
+            fisiere.append(path)
+    return fisiere, ignorate
+
+
+def port_liber():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def porneste_server(server_args, startup_timeout):
+    """Porneste scripts/serve.py pe un port liber si asteapta /health"""
+    port = port_liber()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "serve.py")
+    proces = subprocess.Popen([sys.executable, script, "--port", str(port)] + server_args)
+    url = f"http://127.0.0.1:{port}"
+
+    start = time.time()
+    while time.time() - start < startup_timeout:
+        if proces.poll() is not None:
+            raise RuntimeError(f"Serverul s-a oprit la pornire (cod {proces.returncode})")
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1):
+                print(f"Server pornit in {time.time() - start:.1f}s: {url}")
+                return proces, url
+        except OSError:
+            time.sleep(0.2)
+
+    proces.terminate()
+    raise RuntimeError(f"Serverul nu a raspuns in {startup_timeout}s")
+
+
+def corp_multipart(nume_fisier, continut):
+    boundary = uuid.uuid4().hex
+    corp = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{os.path.basename(nume_fisier)}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + continut + f"\r\n--{boundary}--\r\n".encode()
+    return corp, f"multipart/form-data; boundary={boundary}"
+
+
+def trimite(url, nume_fisier, continut, timeout):
+    """O cerere POST; intoarce (status, eroare)"""
+    corp, content_type = corp_multipart(nume_fisier, continut)
+    cerere = urllib.request.Request(f"{url}/upload-audio/", data=corp, headers={"Content-Type": content_type})
+    try:
+        with urllib.request.urlopen(cerere, timeout=timeout) as raspuns:
+            raspuns.read()
+            return raspuns.status, None
+    except urllib.error.HTTPError as e:
+        return e.code, f"HTTP {e.code}"
+    except Exception as e:
+        return None, type(e).__name__
+
+
+def ruleaza(url, fisiere, args):
+    """Trimite cererile si intoarce inregistrarile per cerere"""
+    rng = random.Random(args.seed)
+    # Fisierele sunt citite in memorie inainte de test (discul clientului nu influenteaza latenta)
+    continut = {f: open(f, "rb").read() for f in fisiere}
+    # Fiecare trecere prin dataset foloseste toate fisierele, in ordine aleatoare
+    ordine = []
+    while len(ordine) < args.requests:
+        trecere = list(fisiere)
+        rng.shuffle(trecere)
+        ordine.extend(trecere)
+    ordine = ordine[:args.requests]
+
+    inregistrari = []
+    lock = threading.Lock()
+    t0 = time.perf_counter()
+    sfarsit = t0 + args.duration if args.duration else None
+
+    def cerere(i, fisier, programat):
+        trimis = time.perf_counter()
+        status, eroare = trimite(url, fisier, continut[fisier], args.timeout)
+        gata = time.perf_counter()
+        with lock:
+            inregistrari.append({
+                "index": i, "fisier": fisier, "status": status, "eroare": eroare,
+                "bytes": len(continut[fisier]),
+                # Latenta se masoara de la sosirea programata (include asteptarea in coada clientului)
+                "latenta": gata - programat, "serviciu": gata - trimis,
+                "start": programat - t0, "final": gata - t0,
+            })
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        if args.rate > 0:
+            # Bucla deschisa: sosiri Poisson, independent de raspunsurile serverului
+            sosire = t0
+            for i, fisier in enumerate(ordine):
+                sosire += rng.expovariate(args.rate)
+                if sfarsit is not None and sosire > sfarsit:
+                    break
+                time.sleep(max(0.0, sosire - time.perf_counter()))
+                executor.submit(cerere, i, fisier, sosire)
+        else:
+            # Bucla inchisa: `concurrency` clienti, fiecare trimite urmatoarea cerere imediat
+            coada = iter(enumerate(ordine))
+            coada_lock = threading.Lock()
+
+            def client():
+                while True:
+                    with coada_lock:
+                        urmator = next(coada, None)
+                    if urmator is None or (sfarsit is not None and time.perf_counter() > sfarsit):
+                        return
+                    cerere(urmator[0], urmator[1], time.perf_counter())
+
+            for _ in range(args.concurrency):
+                executor.submit(client)
+
+    return sorted(inregistrari, key=lambda r: r["index"])
+
+
+def histograma(latente):
+    """Numarul de cereri per interval de latenta, ca linii de text"""
+    limite = LIMITE_HISTOGRAMA + [float("inf")]
+    numar = np.histogram(latente, bins=[0] + limite)[0] if len(latente) else np.zeros(len(limite), int)
+    maxim = max(numar.max(), 1)
+    linii, jos = [], 0
+    for sus, n in zip(limite, numar):
+        if n:
+            eticheta = f"{jos:g}-{sus:g}s" if sus != float("inf") else f">{jos:g}s"
+            linii.append(f"   {eticheta:>12} | {'#' * int(40 * n / maxim):<40} {n}")
+        jos = sus
+    return linii, {f"<={s:g}": int(n) for s, n in zip(limite, numar)}
+
+
+def raport(inregistrari, args, memorie, server_args):
+    masurate = [r for r in inregistrari if r["index"] >= args.warmup] or inregistrari
+    ok = [r for r in masurate if r["eroare"] is None]
+    erori = {}
+    for r in masurate:
+        if r["eroare"] is not None:
+            cheie = f"{r['eroare']} ({os.path.splitext(r['fisier'])[1].lower()})"
+            erori[cheie] = erori.get(cheie, 0) + 1
+
+    latente = np.array([r["latenta"] for r in ok])
+    serviciu = np.array([r["serviciu"] for r in ok])
+    durata = (max(r["final"] for r in masurate) - min(r["start"] for r in masurate)) if masurate else 0.0
+
+    def percentile(valori):
+        if not len(valori):
+            return {}
+        p50, p95, p99 = np.percentile(valori, [50, 95, 99])
+        return {"p50": p50, "p95": p95, "p99": p99, "medie": valori.mean(), "min": valori.min(), "max": valori.max()}
+
+    linii_histograma, histograma_json = histograma(latente)
+    rezultat = {
+        "config": {k: v for k, v in vars(args).items() if k != "server_args"},
+        "server_args": server_args,
+        "cereri": len(masurate),
+        "reusite": len(ok),
+        "rata_erori": (len(masurate) - len(ok)) / len(masurate) if masurate else 0.0,
+        "erori": erori,
+        "durata_s": durata,
+        "throughput_rps": len(ok) / durata if durata else 0.0,
+        "latenta_s": percentile(latente),
+        "serviciu_s": percentile(serviciu),
+        "histograma_latenta": histograma_json,
+        "memorie_server": memorie,
+        "inregistrari": inregistrari,
+    }
+
+    print("\n" + "=" * 80)
+    print("REZULTATE TEST DE INCARCARE")
+    print("=" * 80)
+    print(f"Cereri: {rezultat['cereri']} (fara {args.warmup} de incalzire), reusite: {len(ok)}, "
+          f"rata erori: {rezultat['rata_erori']:.1%}")
+    for eroare, n in sorted(erori.items(), key=lambda e: -e[1]):
+        print(f"   {eroare}: {n}")
+    print(f"Durata: {durata:.1f}s, throughput: {rezultat['throughput_rps']:.2f} cereri/s")
+    for nume, valori in (("Latenta", rezultat["latenta_s"]), ("Serviciu", rezultat["serviciu_s"])):
+        if valori:
+            print(f"{nume:>8}: p50 {valori['p50']:.3f}s  p95 {valori['p95']:.3f}s  p99 {valori['p99']:.3f}s  "
+                  f"(medie {valori['medie']:.3f}s, max {valori['max']:.3f}s)")
+    if linii_histograma:
+        print("Histograma latentei:")
+        print("\n".join(linii_histograma))
+    if memorie:
+        print(f"Memorie server: RSS max {memorie['rss_max'] / 2**20:.0f} MB, "
+              f"final {memorie['rss_final'] / 2**20:.0f} MB, PSS max {memorie['pss_max'] / 2**20:.0f} MB "
+              f"({memorie['procese']} procese)")
+    return rezultat
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    server_args = args.server_args[1:] if args.server_args[:1] == ["--"] else args.server_args
+
+    fisiere, ignorate = gaseste_fisiere(args.files, verifica_decodare=not args.no_decode_check)
+    if ignorate:
+        print(f"{len(ignorate)} fisiere ignorate (nu pot fi decodate cu libsndfile): "
+              f"{', '.join(os.path.basename(p) for p in ignorate)}")
+    if not fisiere:
+        print(f"Niciun fisier audio gasit pentru: {' '.join(args.files)}")
+        sys.exit(1)
+    print(f"{len(fisiere)} fisiere audio, {args.requests} cereri, concurenta {args.concurrency}, "
+          f"{'rata ' + format(args.rate, 'g') + ' cereri/s' if args.rate > 0 else 'bucla inchisa'}")
+
+    proces, sampler = None, None
+    url = args.url.rstrip("/") if args.url else None
+    try:
+        if url is None:
+            proces, url = porneste_server(server_args, args.startup_timeout)
+            sampler = MemorySampler(proces.pid).start()
+
+        inregistrari = ruleaza(url, fisiere, args)
+        memorie = sampler.stop() if sampler else {}
+        if sampler and sampler.samples:
+            memorie["rss_initial"] = sampler.samples[0]["rss"]
+    finally:
+        if proces is not None:
+            proces.terminate()
+            proces.wait(timeout=30)
+
+    rezultat = raport(inregistrari, args, memorie, server_args)
+
+    output = args.output or f"data/load_tests/load_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(rezultat, f, indent=2, ensure_ascii=False)
+    print(f"\nRaport salvat in: {output}")
+
+
+if __name__ == "__main__":
+    main()
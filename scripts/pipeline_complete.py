@@ -6,6 +6,7 @@ Demonstreaza intreaga arhitectura: ASR → NER → JSON → FHIR → DOCX
 
 import sys
 import os
+from dataclasses import asdict
 from datetime import datetime
 from pathlib import Path
 
@@ -50,15 +51,16 @@ def main(audio_path: str = None):
 
     # Importuri (după verificarea dependențelor)
     from transformers import WhisperProcessor, WhisperForConditionalGeneration
-    import soundfile as sf
-    import torchaudio
     import torch
     
     # Adaugă calea către directorul părinte pentru a accesa core
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     
-    from core.medical_entity_extractor import MedicalEntityExtractor
+    from core.medical_entity_extractor import MedicalEntityExtractor, FisaPacient, EXTRACTOR_VERSION
     from core.word_report_generator import generate_word_report
+    from core.results_store import ResultsStore, sursa_fisier
+    from core.result_cache import ResultCache
+    from core.whisper_transcriber import WhisperTranscriber
 
     # Determină fișierul audio
     if audio_path is None:
@@ -81,8 +83,11 @@ def main(audio_path: str = None):
     print("=" * 100)
 
     model_name = "TransferRapid/whisper-large-v3-turbo_ro"
+    # Decodare greedy pe segmente de 30 s; parametrii fac parte din cheia cache-ului
+    decoding_params = {"chunk_sec": 30, "max_length": 448, "num_beams": 1, "temperature": 0.0,
+                       "language": "romanian", "task": "transcribe"}
 
-    try:
+    def run_asr():
         processor = WhisperProcessor.from_pretrained(model_name)
         model = WhisperForConditionalGeneration.from_pretrained(model_name)
 
@@ -91,36 +96,19 @@ def main(audio_path: str = None):
         model.eval()
 
         print(f"Model incărcat cu succes (dispozitiv: {device})")
+        print("\nSe transcrie audio...")
 
-    except Exception as e:
-        print(f"Eroare la incarcarea modelului: {e}")
-        return
+        # Audio-ul este citit in flux si resamplat incremental la 16 kHz (memorie constanta)
+        transcriber = WhisperTranscriber(model, processor, device, **decoding_params)
+        return transcriber.transcribe(audio_path)
 
-    print("\nSe transcrie audio...")
+    # Cache-ul evita rularea ASR (si incarcarea modelului) pentru inregistrari deja procesate
+    cache = ResultCache()
 
     try:
-        waveform_np, sample_rate = sf.read(audio_path, dtype='float32')
-        waveform = torch.from_numpy(waveform_np)
-
-        #Convert stereo -> mono if needed
-        if len(waveform.shape) > 1:
-            waveform = waveform.mean(dim=1)
-
-        # Resample la 16kHz if needed
-        if sample_rate != 16000:
-            resampler = torchaudio.transforms.Resample(orig_freq=sample_rate, new_freq=16000)
-            waveform = resampler(waveform)
-
-        waveform_np = waveform.numpy() if isinstance(waveform, torch.Tensor) else waveform
-        inputs = processor(waveform_np, sampling_rate=16000, return_tensors="pt")
-        inputs = {key: val.to(device) for key, val in inputs.items()}
-
-        forced_decoder_ids = processor.tokenizer.get_decoder_prompt_ids(language="romanian", task="transcribe")
-
-        with torch.no_grad():
-            generated_ids = model.generate(inputs["input_features"], forced_decoder_ids=forced_decoder_ids)
-
-        transcript = processor.tokenizer.batch_decode(generated_ids, skip_special_tokens=True)[0]
+        transcript, cache_key, cache_hit = cache.transcribe_cached(audio_path, model_name, decoding_params, run_asr)
+        if cache_hit:
+            print("Transcriere gasita in cache (ASR omis)")
 
         print(f"Transcriere completă ({len(transcript)} caractere)")
         print(f"\nTRANSCRIPȚIE:\n{'-' * 100}")
@@ -140,9 +128,12 @@ def main(audio_path: str = None):
 
     try:
         extractor = MedicalEntityExtractor()
-        fisa_pacient = extractor.extract_all_entities(transcript)
+        fisa_data, cache_hit = cache.extract_cached(
+            cache_key, EXTRACTOR_VERSION, lambda: asdict(extractor.extract_all_entities(transcript))
+        )
+        fisa_pacient = FisaPacient(**fisa_data)
 
-        print("Extractie completa\n")
+        print("Extractie completa (din cache)\n" if cache_hit else "Extractie completa\n")
 
         print("MASURĂTORI ECOGRAFICE:")
         print("-" * 100)
@@ -196,6 +187,15 @@ def main(audio_path: str = None):
         print(f"Eroare la salvarea JSON: {e}")
         return
 
+    try:
+        with ResultsStore() as store:
+            store.add_fisa(fisa_pacient, sursa=sursa_fisier(json_path))
+        print("Fisa adaugata in depozitul de rezultate (data/results.db)")
+
+    except Exception as e:
+        # Depozitul este auxiliar: JSON-ul ramane sursa de adevar
+        print(f"Avertisment: fisa nu a putut fi adaugata in depozit: {e}")
+
     # ========== PASUL 4: Generare Raport Word ==========
     print("\n" + "=" * 100)
     print("PASUL 4: GENERARE RAPORT WORD")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Interogarea depozitului de rezultate (SQLite)
+
+Exemple:
+    python scripts/query_results.py backfill
+    python scripts/query_results.py masuratori --structura "aorta la sinusuri" --peste 35 --trimestru
+    python scripts/query_results.py studii --medicament aspenter
+    python scripts/query_results.py stats
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# Adaugă calea către directorul părinte pentru a accesa core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.results_store import PATTERN_FISE, ResultsStore, inceput_trimestru
+
+
+def parse_data(text):
+    """Accepta YYYY-MM-DD sau YYYY-MM-DDTHH:MM:SS"""
+    return datetime.fromisoformat(text)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Depozit SQLite pentru fisele pacientilor")
+    parser.add_argument("--db", default="data/results.db", help="Calea catre baza de date")
+    sub = parser.add_subparsers(dest="comanda", required=True)
+
+    backfill = sub.add_parser("backfill", help="Importa fisierele JSON existente")
+    backfill.add_argument("--director", default="data")
+    backfill.add_argument("--pattern", default=PATTERN_FISE)
+    backfill.add_argument("--batch-size", type=int, default=500)
+
+    for nume in ("masuratori", "studii"):
+        p = sub.add_parser(nume)
+        p.add_argument("--de-la", type=parse_data, help="Inceputul perioadei (inclusiv)")
+        p.add_argument("--pana-la", type=parse_data, help="Sfarsitul perioadei (exclusiv)")
+        p.add_argument("--trimestru", action="store_true", help="Doar trimestrul curent")
+        if nume == "masuratori":
+            p.add_argument("--structura", help='Ex: "aorta la sinusuri"')
+            p.add_argument("--min", type=float, dest="min_valoare", help="Valoarea minima (inclusiv, >=)")
+            p.add_argument("--max", type=float, dest="max_valoare", help="Valoarea maxima (inclusiv, <=)")
+            p.add_argument("--peste", type=float, help="Doar valorile strict mai mari (>)")
+            p.add_argument("--sub", type=float, help="Doar valorile strict mai mici (<)")
+            p.add_argument("--unitate")
+        else:
+            p.add_argument("--medicament")
+            p.add_argument("--simptom")
+            p.add_argument("--diagnostic")
+
+    sub.add_parser("stats", help="Sumar al depozitului")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    with ResultsStore(args.db) as store:
+        if args.comanda == "backfill":
+            inserate = store.backfill_from_json(args.director, args.pattern, batch_size=args.batch_size)
+            print(f"Studii noi importate: {inserate}")
+            return
+
+        if args.comanda == "stats":
+            stats = store.stats()
+            print(f"Studii: {stats['studii']}")
+            for s in stats['structuri']:
+                print(f"   {s['structura']}: n={s['numar']}, medie={s['medie']:.2f}, "
+                      f"min={s['minim']}, max={s['maxim']}")
+            return
+
+        de_la = inceput_trimestru() if args.trimestru else args.de_la
+        if args.comanda == "masuratori":
+            rezultate = store.query_masuratori(args.structura, args.min_valoare, args.max_valoare,
+                                               de_la=de_la, pana_la=args.pana_la, unitate=args.unitate,
+                                               peste=args.peste, sub=args.sub)
+            for r in rezultate:
+                print(f"{r['creat_la']}  #{r['studiu_id']}  {r['structura']}: {r['valoare']} {r['unitate']}  ({r['sursa']})")
+        else:
+            rezultate = store.query_studii(args.medicament, args.simptom, args.diagnostic,
+                                           de_la=de_la, pana_la=args.pana_la)
+            for r in rezultate:
+                print(f"{r['creat_la']}  #{r['studiu_id']}  {r['sursa']}")
+
+        print(f"\nRezultate: {len(rezultate)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Porneste serviciul de transcriere (POST /upload-audio/) cu uvicorn
+
+Exemple:
+    python scripts/serve.py --port 8000
+    python scripts/serve.py --stub --workers 2
+    python scripts/serve.py --num-beams 1 --batch-size 4 --quantize
+    python scripts/serve.py --asr-workers 8 --num-beams 1
+    python scripts/serve.py --adaptive-beam --logprob-threshold -0.6
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Adaugă calea către directorul părinte pentru a accesa core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.asr_service import StubTranscriber, create_app
+
+MODEL_ID = "alexvladu1/whisper_finetuned_ro"
+# Configuratia ajunge in fiecare worker uvicorn prin mediu
+ENV_CONFIG = "ASR_SERVE_CONFIG"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serviciul de transcriere audio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Procese uvicorn (fiecare cu modelul lui)")
+    parser.add_argument("--asr-workers", type=int, default=0,
+                        help="Procese ASR pe CPU care partajeaza un singur model (0 = in procesul serverului)")
+    parser.add_argument("--model", default=MODEL_ID)
+    parser.add_argument("--num-beams", type=int, default=5)
+    parser.add_argument("--adaptive-beam", action="store_true",
+                        help="Greedy pe fiecare segment, beam search doar pentru segmentele cu incredere mica")
+    parser.add_argument("--logprob-threshold", type=float, default=-0.6)
+    parser.add_argument("--compression-ratio-threshold", type=float, default=2.4)
+    parser.add_argument("--batch-size", type=int, default=1, help="Segmente de 30 s per generate")
+    parser.add_argument("--quantize", action="store_true", help="Cuantizare dinamica int8 (doar CPU)")
+    parser.add_argument("--cache", action="store_true", help="Foloseste cache-ul de transcrieri (data/cache.db)")
+    parser.add_argument("--stub", action="store_true", help="Model stub: fara descarcari, doar decodare audio")
+    parser.add_argument("--stub-rtf", type=float, default=0.05, help="Secunde de 'inferenta' per secunda de audio")
+    parser.add_argument("--upload-folder", default="uploads")
+    parser.add_argument("--keep-uploads", action="store_true")
+    return parser
+
+
+def build_transcribe(config):
+    """Functia audio_path -> text pentru configuratia data"""
+    if config["stub"]:
+        stub = StubTranscriber(config["stub_rtf"])
+        return stub.transcribe
+
+    import torch
+    from transformers import WhisperProcessor, WhisperForConditionalGeneration
+    from core.whisper_transcriber import AdaptiveBeamPolicy, WhisperTranscriber
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    processor = WhisperProcessor.from_pretrained(config["model"])
+    model = WhisperForConditionalGeneration.from_pretrained(config["model"])
+    model.eval()
+    if config["asr_workers"]:
+        device = torch.device("cpu")
+    if config["quantize"]:
+        device = torch.device("cpu")
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.to(device)
+
+    adaptive = None
+    if config["adaptive_beam"]:
+        adaptive = AdaptiveBeamPolicy(config["logprob_threshold"], config["compression_ratio_threshold"])
+
+    if config["asr_workers"]:
+        from core.parallel_asr import ParallelTranscriber
+        transcriber = ParallelTranscriber(model, processor, num_workers=config["asr_workers"],
+                                          num_beams=config["num_beams"], adaptive=adaptive)
+    else:
+        transcriber = WhisperTranscriber(model, processor, device, num_beams=config["num_beams"],
+                                         batch_size=config["batch_size"], adaptive=adaptive)
+
+    def transcribe(audio_path):
+        return transcriber.transcribe(audio_path, verbose=False)
+
+    if not config["cache"]:
+        return transcribe
+
+    from core.result_cache import ResultCache
+    cache = ResultCache()
+    model_id = config["model"] + ("-int8" if config["quantize"] else "")
+
+    def transcribe_cached(audio_path):
+        return cache.transcribe_cached(audio_path, model_id, transcriber.decoding_params,
+                                       lambda: transcribe(audio_path))[0]
+    return transcribe_cached
+
+
+def build_app():
+    """Factory apelat de uvicorn in fiecare worker"""
+    config = json.loads(os.environ[ENV_CONFIG])
+    # Mesajele core.* (ex: segmentele escaladate de beam-ul adaptiv) apar in logul serverului
+    logging.basicConfig(format="%(asctime)s %(name)s: %(message)s")
+    logging.getLogger("core").setLevel(logging.INFO)
+    # Cu procese ASR, mai multe cereri pot rula simultan (segmentele lor impart workerii)
+    return create_app(build_transcribe(config), config["upload_folder"], keep_uploads=config["keep_uploads"],
+                      max_concurrency=max(1, config["asr_workers"]))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    import uvicorn
+
+    os.environ[ENV_CONFIG] = json.dumps(vars(args))
+    print(f"Serviciu pornit pe http://{args.host}:{args.port} "
+          f"({'stub' if args.stub else args.model}, {args.workers} worker(i))")
+    uvicorn.run("serve:build_app", factory=True, app_dir=os.path.dirname(os.path.abspath(__file__)),
+                host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()